@@ -0,0 +1,36 @@
+"""Shared setup for the benchmark scripts in this directory."""
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django(database_url=None):
+    """
+    Configure Django from bookstore.settings. `database_url` is used when
+    DATABASE_URL isn't set, so benchmarks don't need the Docker database.
+    """
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookstore.settings')
+    if database_url:
+        os.environ.setdefault('DATABASE_URL', database_url)
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """A throwaway test database, as `manage.py test` would create"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
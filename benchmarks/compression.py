@@ -0,0 +1,74 @@
+"""
+Response size and latency of real API endpoints with and without
+compression (identity, gzip, brotli), against the populate_db dataset.
+
+    python benchmarks/compression.py [--repeat 50]
+
+Runs on a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import io
+import statistics
+import time
+
+from common import setup_django, test_database
+
+setup_django(database_url='sqlite://:memory:')
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from books.models import Book, Cart, CartItem  # noqa: E402
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def fill_cart(user, count):
+    cart, _ = Cart.objects.get_or_create(user=user)
+    for book in Book.objects.all()[:count]:
+        CartItem.objects.get_or_create(cart=cart, book=book)
+
+
+def measure(client, url, encoding, repeat):
+    timings = []
+    for _ in range(repeat):
+        cache.clear()  # keep the throttles out of the way
+        start = time.perf_counter()
+        response = client.get(url, HTTP_ACCEPT_ENCODING=encoding, secure=True)
+        timings.append(time.perf_counter() - start)
+    assert response.status_code == 200, (url, response.status_code)
+    return len(response.content), statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with test_database():
+        call_command('populate_db', stdout=io.StringIO())
+        user = User.objects.first()
+        fill_cart(user, 10)
+
+        anonymous, buyer = APIClient(), APIClient()
+        buyer.force_authenticate(user=user)
+        endpoints = [
+            (anonymous, '/api/authors/'),
+            (anonymous, '/api/books/'),
+            (anonymous, f'/api/books/{Book.objects.first().id}/'),
+            (buyer, '/api/cart/'),
+        ]
+
+        print(f'{"endpoint":<22}' + ''.join(f'{e:>22}' for e in ENCODINGS))
+        for client, url in endpoints:
+            cells = []
+            for encoding in ENCODINGS:
+                size, latency = measure(client, url, encoding, args.repeat)
+                cells.append(f'{size:>8,} B {latency:>7.2f} ms')
+            print(f'{url:<22}' + ''.join(f'{c:>22}' for c in cells))
+
+
+if __name__ == '__main__':
+    main()
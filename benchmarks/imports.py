@@ -0,0 +1,73 @@
+"""
+Rows imported per second by the book import pipeline against the number of
+worker processes validating rows.
+
+    python benchmarks/imports.py [--rows 20000] [--workers 1 2 4]
+
+Runs on a throwaway SQLite database unless DATABASE_URL is set. Worker
+counts default to powers of two up to the number of CPUs.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import setup_django, test_database
+
+setup_django(database_url='sqlite://:memory:')
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from books import importer  # noqa: E402
+from books.models import Book, BookHistory, OutboxEvent  # noqa: E402
+
+
+def build_rows(count):
+    """Feed rows as read from a CSV file: every value a string"""
+    return [
+        {
+            'title': f'Book {i}', 'isbn': f'978{i:010d}', 'author': f'Author {i % 200}',
+            'editorial': f'Editorial {i % 20}', 'seller': 'booklover1', 'price': f'{5 + i % 40}.99',
+            'condition': 'good', 'language': 'en', 'pages': str(100 + i % 900),
+            'publication_date': f'{1900 + i % 120}-01-31', 'quantity': str(i % 5),
+            'description': f'Copy {i} of a classic.',
+        }
+        for i in range(count)
+    ]
+
+
+def default_workers():
+    counts, workers = [], 1
+    while workers <= (os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers())
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    if connection.vendor == 'sqlite':
+        # Workers connect from other processes, so the database must be a file
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'imports.sqlite3')
+
+    rows = build_rows(args.rows)
+    with test_database():
+        User.objects.create_user(username='booklover1')
+        for workers in args.workers:
+            for model in (OutboxEvent, BookHistory, Book):
+                model.objects.all().delete()
+            start = time.perf_counter()
+            report = importer.import_rows(rows, workers=workers, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - start
+            assert report['created'] == args.rows, report
+            print(f'{workers:>3} workers {args.rows / elapsed:>12,.0f} rows/s  ({elapsed:.2f} s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Rows serialized per second on the /api/books/ list path, before (DRF
+ModelSerializer + JSONRenderer over model instances) and after (ValuesPlan
+over .values() rows + FastJSONRenderer).
+
+    python benchmarks/serializers.py [--rows 20000]
+
+No database is needed: both paths are fed the same rows built in memory.
+"""
+import argparse
+import datetime
+import time
+from decimal import Decimal
+
+from common import setup_django
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from books.models import Author, Book, Editorial  # noqa: E402
+from books.renderers import FastJSONRenderer  # noqa: E402
+from books.serializers import BookListSerializer, ValuesPlan  # noqa: E402
+
+
+def build_books(count):
+    author = Author(id=1, name='Jane Austen')
+    editorial = Editorial(id=1, name='Penguin Classics')
+    seller = User(id=1, username='booklover1')
+    created = datetime.datetime(2025, 11, 16, 23, 45, 12, 345678, tzinfo=datetime.timezone.utc)
+    return [
+        Book(
+            id=i, title=f'Book {i}', isbn=f'{i:013d}', price=Decimal('12.99'),
+            condition='good', quantity=3, is_available=True, created_at=created,
+            author=author, editorial=editorial, seller=seller,
+        )
+        for i in range(count)
+    ]
+
+
+def as_values_rows(books, plan):
+    rows = []
+    for book in books:
+        row = {}
+        for key in plan.keys:
+            value = book
+            for attr in key.split('__'):
+                value = getattr(value, attr)
+            row[key] = value
+        rows.append(row)
+    return rows
+
+
+def measure(label, func, rows):
+    func()  # warm up
+    start = time.perf_counter()
+    payload = func()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {rows / elapsed:>12,.0f} rows/s  ({len(payload):,} bytes)')
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    books = build_books(args.rows)
+    plan = ValuesPlan.compile(BookListSerializer())
+    rows = as_values_rows(books, plan)
+
+    before = measure(
+        'ModelSerializer + JSONRenderer',
+        lambda: JSONRenderer().render(BookListSerializer(books, many=True).data),
+        args.rows,
+    )
+    after = measure(
+        'ValuesPlan + FastJSONRenderer',
+        lambda: FastJSONRenderer().render(plan.render(rows)),
+        args.rows,
+    )
+    assert before == after, 'fast path output differs from DRF output'
+
+
+if __name__ == '__main__':
+    main()
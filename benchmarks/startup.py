@@ -0,0 +1,61 @@
+"""
+Cold start of a web worker: `python -X importtime` profile of importing
+bookstore.wsgi and the URLconf, checked against a startup-time budget.
+
+    python benchmarks/startup.py [--repeat 5] [--budget-ms 1000] [--top 15]
+
+Each run is a fresh interpreter, as a new gunicorn instance would be. Exits
+with status 1 when the median import time is over the budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from common import ROOT
+
+STATEMENT = 'import bookstore.wsgi, bookstore.urls'
+
+
+def profile():
+    """{module: (self µs, cumulative µs)} and the total µs of one cold import"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='bookstore.settings')
+    env.setdefault('DATABASE_URL', 'sqlite://:memory:')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STATEMENT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules, total = {}, 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(own), int(cumulative))
+        if not name.startswith('  '):  # top-level import
+            total += int(cumulative)
+    return modules, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1000)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [profile() for _ in range(args.repeat)]
+    modules, _ = runs[-1]
+    print(f'{"module":<50} {"self ms":>9} {"cumulative ms":>14}')
+    slowest = sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]
+    for name, (own, cumulative) in slowest:
+        print(f'{name:<50} {own / 1000:>9.1f} {cumulative / 1000:>14.1f}')
+
+    total = statistics.median(total for _, total in runs) / 1000
+    print(f'\nmedian import time {total:.0f} ms (budget {args.budget_ms:.0f} ms)')
+    if total > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import Author, Editorial, Book, Cart, CartItem
+from .models import (
+    Author, Editorial, Book, Cart, CartItem, StockReservation, OutboxEvent,
+    BookHistory, BookDailyHistory
+)
+from .pagination import EstimatedCountPaginator
+
+# Changelists of the large tables below avoid per-row queries (list_select_related
+# covers every relation used by list_display and __str__), use autocomplete widgets
+# instead of rendering every related row into a <select>, and only search indexed
+# columns: exact ISBN/username matches and title prefixes ("^", see migration 0005).
 
 
 @admin.register(Author)
@@ -22,22 +31,78 @@ class EditorialAdmin(admin.ModelAdmin):
 class BookAdmin(admin.ModelAdmin):
     list_display = ['title', 'isbn', 'author', 'editorial', 'seller', 'price', 'quantity', 'condition', 'is_available', 'created_at']
     list_filter = ['condition', 'is_available', 'language', 'created_at']
-    search_fields = ['title', 'isbn', 'description']
+    list_select_related = ['author', 'editorial', 'seller']
+    autocomplete_fields = ['author', 'editorial', 'seller']
+    search_fields = ['isbn__exact', '^title']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ['user', 'created_at', 'updated_at']
     list_filter = ['created_at', 'updated_at']
-    search_fields = ['user__username', 'user__email']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
+    search_fields = ['user__username__exact']
     ordering = ['-updated_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ['cart', 'book', 'quantity', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['book__title', 'cart__user__username']
+    list_select_related = ['cart__user', 'book']
+    autocomplete_fields = ['cart', 'book']
+    search_fields = ['book__isbn__exact', 'cart__user__username__exact']
     ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['cart', 'book', 'quantity', 'expires_at']
+    list_filter = ['expires_at']
+    list_select_related = ['cart__user', 'book']
+    autocomplete_fields = ['cart', 'book']
+    search_fields = ['book__isbn__exact', 'cart__user__username__exact']
+    ordering = ['expires_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['topic']
+    readonly_fields = ['created_at', 'processed_at']
+    ordering = ['-id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(BookHistory)
+class BookHistoryAdmin(admin.ModelAdmin):
+    list_display = ['book', 'recorded_at', 'price', 'quantity', 'quantity_change']
+    list_select_related = ['book']
+    autocomplete_fields = ['book']
+    search_fields = ['book__isbn__exact']
+    ordering = ['-recorded_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(BookDailyHistory)
+class BookDailyHistoryAdmin(admin.ModelAdmin):
+    list_display = ['book', 'day', 'close_price', 'close_quantity', 'units_sold', 'units_added']
+    list_select_related = ['book']
+    autocomplete_fields = ['book']
+    search_fields = ['book__isbn__exact']
+    ordering = ['-day']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
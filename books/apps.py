@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class BooksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'books'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .catalog import catalog_changed
+        from .models import Author, Book, Editorial
+        from .reference import CACHES
+
+        # Any change to the catalog invalidates the cached facet counts
+        for model in (Book, Author, Editorial):
+            post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_changed_{model.__name__}')
+            post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_changed_{model.__name__}')
+
+        # Processes drop their in-memory copies of a reference table when it changes
+        for model, reference in CACHES.items():
+            post_save.connect(reference.changed, sender=model, dispatch_uid=f'reference_changed_{model.__name__}')
+            post_delete.connect(reference.changed, sender=model, dispatch_uid=f'reference_changed_{model.__name__}')
@@ -0,0 +1,18 @@
+from rest_framework.authentication import SessionAuthentication
+
+
+class GuestSessionAuthentication(SessionAuthentication):
+    """
+    Session authentication that also enforces CSRF when the session has no
+    user. DRF only checks CSRF for logged-in sessions, but an anonymous
+    session can hold state too (the guest cart, merged into the user's cart
+    at login), so a cross-site request mustn't be able to write it.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        # Requests with credentials of their own (e.g. Basic auth) are left to
+        # the other authentication classes; safe methods pass the check
+        if result is None and 'HTTP_AUTHORIZATION' not in request.META:
+            self.enforce_csrf(request)
+        return result
@@ -0,0 +1,172 @@
+import hashlib
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, IntegerField, Value, When
+from django.db.models.functions import Cast
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+# Upper bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKET_BOUNDS = (Decimal('10'), Decimal('20'), Decimal('50'), Decimal('100'))
+
+# Authors and editorials beyond this many (by count) are left out of the facets
+FACET_LIMIT = 50
+
+# Filter parameters of each facet, left out when counting that facet
+FACET_PARAMS = {
+    'condition': ('condition',),
+    'language': ('language',),
+    'author': ('author',),
+    'editorial': ('editorial',),
+    'price': ('min_price', 'max_price'),
+}
+
+
+def catalog_version():
+    """
+    Current catalog version. Cached facets are keyed by it, so bumping the
+    version invalidates all of them at once without deleting any keys.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost key never reuses an old version
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1000, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        catalog_version()
+
+
+def catalog_changed(sender, **kwargs):
+    """post_save/post_delete receiver for the models the facets count"""
+    transaction.on_commit(bump_catalog_version)
+
+
+def price_bucket():
+    """Index of the price bucket each book falls in"""
+    whens = [When(price__lt=bound, then=Value(i)) for i, bound in enumerate(PRICE_BUCKET_BOUNDS)]
+    return Case(*whens, default=Value(len(PRICE_BUCKET_BOUNDS)), output_field=IntegerField())
+
+
+def facet_rows(queryset, facet, column, label=Value(''), limit=None):
+    """
+    (facet, value, label, count) rows of `queryset` grouped by `column`,
+    only for the `limit` largest groups (ties by label) when given
+    """
+    queryset = queryset.order_by()
+    if limit is not None:
+        # The database picks the top groups, so the rows fetched stay bounded
+        # however many values the column has. A subquery rather than a LIMIT
+        # on the branch itself, which SQLite doesn't allow in a UNION.
+        top = (
+            queryset.values(column).annotate(rows=Count('pk'))
+            .order_by('-rows', label.asc()).values(column)[:limit]
+        )
+        queryset = queryset.filter(**{f'{column}__in': top})
+    # Cast so every column of the UNION has a declared type, parameters included
+    return (
+        queryset
+        .annotate(
+            facet=Cast(Value(facet), CharField()),
+            value=Cast(column, CharField()),
+            label=Cast(label, CharField()),
+        )
+        .values('facet', 'value', 'label')
+        .annotate(count=Count('pk'))
+    )
+
+
+def compute_facets(queryset, params, apply_filters):
+    """
+    Counts per condition, language, author, editorial and price bucket for
+    the books in `queryset` filtered by `params` through
+    `apply_filters(queryset, params)`.
+
+    Each facet is counted with every filter but its own, so choosing a
+    condition still shows how many books the other conditions have. Every
+    facet is its own GROUP BY, which returns one row per value (at most
+    FACET_LIMIT for authors and editorials), and all of them are sent as a
+    single UNION ALL query.
+    """
+    def filtered(facet):
+        own = FACET_PARAMS.get(facet, ())
+        return apply_filters(queryset, {name: value for name, value in params.items() if name not in own})
+
+    # The 'count' row is the total of the fully filtered books
+    rows = facet_rows(filtered('count'), 'count', Value('')).union(
+        facet_rows(filtered('condition'), 'condition', 'condition'),
+        facet_rows(filtered('language'), 'language', 'language'),
+        facet_rows(filtered('author'), 'author', 'author_id', F('author__name'), FACET_LIMIT),
+        facet_rows(filtered('editorial'), 'editorial', 'editorial_id', F('editorial__name'), FACET_LIMIT),
+        facet_rows(filtered('price'), 'price', price_bucket()),
+        all=True,
+    )
+
+    condition_labels = dict(queryset.model.CONDITION_CHOICES)
+    conditions = dict.fromkeys(condition_labels, 0)
+    buckets = [0] * (len(PRICE_BUCKET_BOUNDS) + 1)
+    languages, authors, editorials = {}, {}, {}
+    total = 0
+    for row in rows:
+        facet, value, count = row['facet'], row['value'], row['count']
+        if facet == 'count':
+            total = count
+        elif facet == 'condition':
+            conditions[value] = count
+        elif facet == 'language':
+            languages[value] = count
+        elif facet == 'price':
+            buckets[int(value)] = count
+        else:
+            counts = authors if facet == 'author' else editorials
+            counts[int(value), row['label']] = count
+
+    def top(counts):
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0][1]))
+        return [{'value': pk, 'label': name, 'count': count} for (pk, name), count in ranked]
+
+    bounds = (None,) + PRICE_BUCKET_BOUNDS + (None,)
+    return {
+        'count': total,
+        'condition': [
+            {'value': value, 'label': condition_labels.get(value, value), 'count': count}
+            for value, count in conditions.items()
+        ],
+        'language': [
+            {'value': value, 'count': count}
+            for value, count in sorted(languages.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'author': top(authors),
+        'editorial': top(editorials),
+        'price': [
+            {
+                'min': None if low is None else str(low),
+                'max': None if high is None else str(high),
+                'count': count,
+            }
+            for low, high, count in zip(bounds, bounds[1:], buckets)
+        ],
+    }
+
+
+def facets(queryset, params, apply_filters):
+    """
+    Facet counts for `queryset` filtered by `params` (see compute_facets),
+    cached under the catalog version and the filter parameters.
+    """
+    digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    key = f'facets:{catalog_version()}:{digest}'
+    result = cache.get(key)
+    if result is None:
+        result = compute_facets(queryset, params, apply_filters)
+        cache.set(key, result, getattr(settings, 'CATALOG_FACETS_TIMEOUT', 60 * 60))
+    return result
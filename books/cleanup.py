@@ -0,0 +1,86 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from .idempotency import key_ttl
+from .models import Cart, CartItem, IdempotencyKey, OutboxEvent, StockReservation
+
+
+def delete_in_batches(queryset, batch_size=1000, pause=0):
+    """
+    Delete the rows of `queryset` by walking the table's primary key in
+    windows of `batch_size` ids, one short statement (and transaction) per
+    window. Each window only ever touches a bounded index range, so locks
+    are held briefly and the write volume per commit stays small however
+    many rows match. `pause` seconds are slept between windows to let
+    replicas catch up. Returns the number of rows of the queryset's model
+    deleted (cascades not included).
+    """
+    model = queryset.model
+    bounds = model._default_manager.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+
+    deleted = 0
+    start = bounds['low']
+    while start <= bounds['high']:
+        end = start + batch_size
+        _, counts = queryset.filter(pk__gte=start, pk__lt=end).delete()
+        deleted += counts.get(model._meta.label, 0)
+        start = end
+        if pause and start <= bounds['high']:
+            time.sleep(pause)
+    return deleted
+
+
+def purge_empty_carts(min_age, batch_size=1000, pause=0):
+    """Delete carts without items untouched for `min_age`; they are recreated on demand"""
+    carts = Cart.objects.filter(updated_at__lt=timezone.now() - min_age).exclude(
+        Exists(CartItem.objects.filter(cart=OuterRef('pk')))
+    )
+    return delete_in_batches(carts, batch_size, pause)
+
+
+def drop_unavailable_items(batch_size=1000, pause=0):
+    """Remove cart items and reservations for books that are out of stock"""
+    deleted = delete_in_batches(CartItem.objects.filter(book__is_available=False), batch_size, pause)
+    delete_in_batches(StockReservation.objects.filter(book__is_available=False), batch_size, pause)
+    return deleted
+
+
+def expire_idle_carts(ttl, batch_size=1000, pause=0):
+    """
+    Delete carts, with their items and reservations, where neither the cart
+    nor any item has changed for `ttl`.
+    """
+    cutoff = timezone.now() - ttl
+    carts = Cart.objects.filter(updated_at__lt=cutoff).exclude(
+        Exists(CartItem.objects.filter(cart=OuterRef('pk'), updated_at__gte=cutoff))
+    )
+    return delete_in_batches(carts, batch_size, pause)
+
+
+def expire_idempotency_keys(batch_size=1000, pause=0):
+    """Delete stored responses whose Idempotency-Key can no longer be replayed"""
+    keys = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - key_ttl())
+    return delete_in_batches(keys, batch_size, pause)
+
+
+def prune_outbox(batch_size=1000, pause=0):
+    """Delete outbox events processed more than OUTBOX_RETENTION_DAYS ago"""
+    cutoff = timezone.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    return delete_in_batches(OutboxEvent.objects.filter(processed_at__lt=cutoff), batch_size, pause)
+
+
+def cleanup_carts(idle_ttl=timedelta(days=30), empty_min_age=timedelta(days=1), batch_size=1000, pause=0):
+    """Run every cart cleanup job; returns a dict of job -> rows deleted"""
+    return {
+        'idle_carts': expire_idle_carts(idle_ttl, batch_size, pause),
+        'unavailable_items': drop_unavailable_items(batch_size, pause),
+        'empty_carts': purge_empty_carts(empty_min_age, batch_size, pause),
+        'idempotency_keys': expire_idempotency_keys(batch_size, pause),
+        'outbox_events': prune_outbox(batch_size, pause),
+    }
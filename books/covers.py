@@ -0,0 +1,71 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.conf import settings
+
+from .models import Book
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+
+
+def isbn_from_filename(name):
+    """'978-0-14-143951-8.jpg' -> '9780141439518', or None if the name isn't an ISBN"""
+    stem = re.sub(r'[\s-]', '', os.path.splitext(name)[0]).upper()
+    if re.fullmatch(r'\d{13}|\d{9}[\dX]', stem):
+        return stem
+    return None
+
+
+def find_images(directory):
+    """{isbn: path} for the images in `directory` named after an ISBN"""
+    images = {}
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if not entry.is_file() or os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        isbn = isbn_from_filename(entry.name)
+        if isbn:
+            images[isbn] = entry.path
+    return images
+
+
+def ingest(directory, workers=None):
+    """
+    Render the covers of the books whose ISBN names an image in `directory`
+    and point the books at them. Thumbnails are rendered by a pool of
+    `workers` processes (all CPUs by default; 1 renders in this process).
+    Returns (books updated, image ISBNs without a book, ISBNs of images that
+    couldn't be read, whose books are left as they were).
+    """
+    # Pillow is only needed here, not by the views serving the covers
+    from .thumbnails import render_cover
+
+    images = find_images(directory)
+    books = list(Book.objects.filter(isbn__in=images).only('id', 'isbn', 'cover_hash'))
+    paths = [images[book.isbn] for book in books]
+    root = str(settings.COVER_ROOT)
+
+    if workers == 1:
+        digests = [render_cover(path, root) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            digests = list(pool.map(render_cover, paths, repeat(root), chunksize=8))
+
+    changed, unreadable = [], []
+    for book, digest in zip(books, digests):
+        if digest is None:
+            unreadable.append(book.isbn)
+        elif book.cover_hash != digest:
+            book.cover_hash = digest
+            changed.append(book)
+    Book.objects.bulk_update(changed, ['cover_hash'], batch_size=500)
+    return len(changed), sorted(set(images) - {book.isbn for book in books}), sorted(unreadable)
+
+
+def cover_file(path):
+    """Absolute path of a cover variant, or None if `path` doesn't name one"""
+    if not re.fullmatch(r'[0-9a-f]{2}/[0-9a-f]{16}-[SML]\.(jpg|webp)', path):
+        return None
+    full = os.path.join(settings.COVER_ROOT, path)
+    return full if os.path.isfile(full) else None
@@ -0,0 +1,70 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.filters import BaseFilterBackend
+
+
+class BookFilterBackend(BaseFilterBackend):
+    """
+    Filter the book list from query parameters:
+
+        ?available=true&condition=good&language=en&author=3&editorial=2
+        &min_price=5&max_price=20&search=pride
+
+    Each filter is backed by an index from migration 0006 (search is a
+    substring match on the title and is not).
+    """
+    exact_params = {
+        'condition': 'condition',
+        'language': 'language',
+        'author': 'author_id',
+        'editorial': 'editorial_id',
+    }
+    # Parameters whose values are ids; anything but an integer is ignored
+    id_params = ('author', 'editorial')
+    query_params = ('available', *exact_params, 'min_price', 'max_price', 'search')
+
+    def filter_queryset(self, request, queryset, view):
+        return self.apply(queryset, request.query_params)
+
+    def apply(self, queryset, params):
+        """`queryset` narrowed by the filters in `params`, a mapping of query parameters"""
+        available = params.get('available')
+        if available is not None:
+            queryset = queryset.filter(is_available=available.lower() in ('1', 'true', 'yes'))
+
+        for param, lookup in self.exact_params.items():
+            value = params.get(param)
+            if value and param in self.id_params:
+                value = self.parse_id(value)
+            if value:
+                queryset = queryset.filter(**{lookup: value})
+
+        min_price = self.parse_price(params.get('min_price'))
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        max_price = self.parse_price(params.get('max_price'))
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        search = params.get('search', '').strip()
+        if search:
+            queryset = queryset.filter(title__icontains=search)
+        return queryset
+
+    @staticmethod
+    def parse_price(value):
+        if not value:
+            return None
+        try:
+            price = Decimal(value)
+        except InvalidOperation:
+            return None
+        # NaN and Infinity parse but can't be compared with a price column
+        return price if price.is_finite() else None
+
+    @staticmethod
+    def parse_id(value):
+        try:
+            return int(value)
+        except ValueError:
+            return None
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import reservations
+from .models import Book, Cart, CartItem, StockReservation
+
+# Session key of the guest cart: {"<book id>": quantity}, a few bytes per line
+SESSION_KEY = 'cart'
+
+# Lines a guest cart may hold, which keeps the session row small
+MAX_LINES = 100
+
+
+def get_items(session):
+    """{book id: quantity} of the session's guest cart"""
+    return {int(book_id): quantity for book_id, quantity in session.get(SESSION_KEY, {}).items()}
+
+
+def save_items(session, items):
+    if items:
+        session[SESSION_KEY] = {str(book_id): quantity for book_id, quantity in items.items()}
+    else:
+        session.pop(SESSION_KEY, None)
+
+
+def cart_items(items):
+    """Unsaved CartItems for `items`, with their books loaded in one query"""
+    books = Book.objects.select_related('author', 'editorial', 'seller').in_bulk(list(items))
+    return [
+        CartItem(book=books[book_id], quantity=quantity, added_price=books[book_id].price)
+        for book_id, quantity in items.items() if book_id in books
+    ]
+
+
+def merge(session, user):
+    """
+    Move the session's guest cart into the cart of `user` and empty it.
+    Quantities of a book already in the cart are added up and capped at the
+    stock not held by other carts, which one query over the guest cart's
+    books reads along with the cart's own quantities; the merged lines are
+    written with one upsert. Returns {book id: quantity} of the lines that
+    had to be cut down.
+    """
+    items = get_items(session)
+    if not items:
+        return {}
+
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user)
+        held = (
+            StockReservation.objects.active()
+            .filter(book=OuterRef('pk'))
+            .exclude(cart=cart)
+            .values('book')
+            .annotate(total=Sum('quantity'))
+            .values('total')
+        )
+        in_cart = CartItem.objects.filter(cart=cart, book=OuterRef('pk')).values('quantity')
+        books = (
+            Book.objects.filter(id__in=list(items))
+            .select_for_update()
+            .only('id', 'price', 'quantity')
+            .annotate(held=Coalesce(Subquery(held), 0), in_cart=Coalesce(Subquery(in_cart), 0))
+        )
+
+        merged, adjusted = [], {}
+        for book in books:
+            wanted = book.in_cart + items[book.id]
+            # Never below what the cart already had
+            quantity = max(min(wanted, book.quantity - book.held), book.in_cart)
+            if quantity < wanted:
+                adjusted[book.id] = quantity
+            if quantity > book.in_cart:
+                merged.append(CartItem(cart=cart, book=book, quantity=quantity, added_price=book.price))
+
+        if merged:
+            CartItem.objects.bulk_create(
+                merged,
+                update_conflicts=True,
+                unique_fields=['cart', 'book'],
+                update_fields=['quantity', 'updated_at'],
+            )
+            reservations.reserve_many(cart, {item.book_id: item.quantity for item in merged})
+
+    save_items(session, {})
+    return adjusted
@@ -0,0 +1,117 @@
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BookDailyHistory, BookHistory
+
+
+def rollup_cutoff(days):
+    """Start of the day `days` days ago; only whole days are ever rolled up"""
+    day = timezone.localdate() - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rollup(before, batch_size=500):
+    """
+    Fold BookHistory rows recorded before `before` into one BookDailyHistory
+    row per book and day, then delete them. Books are processed in batches of
+    `batch_size` by id range, each batch in its own transaction. Returns the
+    number of history rows rolled up.
+    """
+    rolled = 0
+    last_book_id = 0
+    while True:
+        book_ids = list(
+            BookHistory.objects.filter(recorded_at__lt=before, book_id__gt=last_book_id)
+            .order_by('book_id').values_list('book_id', flat=True).distinct()[:batch_size]
+        )
+        if not book_ids:
+            return rolled
+        last_book_id = book_ids[-1]
+
+        with transaction.atomic():
+            rows = (
+                BookHistory.objects.filter(recorded_at__lt=before, book_id__in=book_ids)
+                .order_by('book_id', 'recorded_at', 'id')
+                .values_list('book_id', 'recorded_at', 'price', 'quantity', 'quantity_change')
+            )
+            days = [
+                summarize_day(book_id, day, list(group))
+                for (book_id, day), group in groupby(
+                    rows.iterator(), key=lambda row: (row[0], timezone.localdate(row[1]))
+                )
+            ]
+            BookDailyHistory.objects.bulk_create(
+                days,
+                update_conflicts=True,
+                unique_fields=['book', 'day'],
+                update_fields=[
+                    'open_price', 'close_price', 'min_price', 'max_price',
+                    'close_quantity', 'units_sold', 'units_added', 'changes',
+                ],
+            )
+            count, _ = BookHistory.objects.filter(recorded_at__lt=before, book_id__in=book_ids).delete()
+            rolled += count
+
+
+def summarize_day(book_id, day, rows):
+    """BookDailyHistory for one book's (book_id, recorded_at, price, quantity, change) rows of a day"""
+    prices = [row[2] for row in rows]
+    changes = [row[4] for row in rows]
+    return BookDailyHistory(
+        book_id=book_id,
+        day=day,
+        open_price=prices[0],
+        close_price=prices[-1],
+        min_price=min(prices),
+        max_price=max(prices),
+        close_quantity=rows[-1][3],
+        units_sold=-sum(change for change in changes if change < 0),
+        units_added=sum(change for change in changes if change > 0),
+        changes=len(rows),
+    )
+
+
+def book_series(book, since=None, until=None):
+    """
+    A book's history between the `since` and `until` dates (inclusive):
+    rolled-up days for the older part, individual changes for the recent part.
+    """
+    daily = BookDailyHistory.objects.filter(book=book)
+    points = BookHistory.objects.filter(book=book)
+    if since is not None:
+        daily = daily.filter(day__gte=since)
+        points = points.filter(recorded_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    if until is not None:
+        daily = daily.filter(day__lte=until)
+        points = points.filter(recorded_at__lt=timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min)))
+    return {
+        'book': book.pk,
+        'daily': [
+            {
+                'day': row['day'].isoformat(),
+                'open_price': str(row['open_price']),
+                'close_price': str(row['close_price']),
+                'min_price': str(row['min_price']),
+                'max_price': str(row['max_price']),
+                'close_quantity': row['close_quantity'],
+                'units_sold': row['units_sold'],
+                'units_added': row['units_added'],
+            }
+            for row in daily.values(
+                'day', 'open_price', 'close_price', 'min_price', 'max_price',
+                'close_quantity', 'units_sold', 'units_added',
+            )
+        ],
+        'points': [
+            {
+                'recorded_at': row['recorded_at'],
+                'price': str(row['price']),
+                'quantity': row['quantity'],
+                'quantity_change': row['quantity_change'],
+            }
+            for row in points.values('recorded_at', 'price', 'quantity', 'quantity_change')
+        ],
+    }
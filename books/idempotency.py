@@ -0,0 +1,93 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def key_ttl():
+    return timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def request_fingerprint(request):
+    """Hash of what the request asks for: method, path with query string and payload"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.get_full_path(), data], sort_keys=True, cls=JSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def replay(record, fingerprint):
+    """The stored response of `record`, if it was stored for the same request"""
+    if record is not None and record.fingerprint != fingerprint:
+        return Response(
+            {'error': f'{HEADER} was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record is None or record.status_code is None:
+        return Response(
+            {'error': f'A request with this {HEADER} is in progress'},
+            status=status.HTTP_409_CONFLICT
+        )
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """
+    Make a viewset action safe to retry: with an Idempotency-Key header, the
+    first request runs and its response is stored in the same transaction;
+    later requests with the key get the stored response back from one
+    lookup instead of running again. Server errors aren't stored, so the
+    request can be retried. Requests without the header, and those of
+    anonymous visitors, run as usual.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response(
+                {'error': f'{HEADER} must be at most 255 characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is not None:
+            if record.created_at > timezone.now() - key_ttl():
+                return replay(record, fingerprint)
+            record.delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    # Concurrent requests with the key wait here for this one to finish
+                    record = IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=fingerprint)
+            except IntegrityError:
+                record = None
+            if record is not None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                else:
+                    record.status_code = response.status_code
+                    # Stored as the JSON renderer would encode it
+                    record.response = json.loads(json.dumps(response.data, cls=JSONEncoder))
+                    record.save(update_fields=['status_code', 'response'])
+                return response
+
+        return replay(IdempotencyKey.objects.filter(user=request.user, key=key).first(), fingerprint)
+
+    return wrapper
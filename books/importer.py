@@ -0,0 +1,200 @@
+import csv
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.core.exceptions import ValidationError
+from django.db import connections
+
+# Book import pipeline: rows are parsed and validated by a pool of worker
+# processes and written by the calling process in ordered batches.
+# Workers are spawned fresh and unpickle this module before Django is set up,
+# so models are only imported inside functions.
+
+# Book fields read from a feed row and validated by the model field
+FIELDS = (
+    'title', 'isbn', 'description', 'publication_date', 'price',
+    'condition', 'pages', 'language', 'quantity',
+)
+# Related objects, referenced by name in the feed
+RELATIONS = {'author': 'name', 'editorial': 'name', 'seller': 'username'}
+
+
+def read_csv(path):
+    """Rows of a CSV feed with a header of FIELDS and RELATIONS"""
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def clean_row(row):
+    """Book field values of a feed row, or ValidationError with every field's errors"""
+    from .models import Book
+
+    values, errors = {}, {}
+    for name in FIELDS:
+        field = Book._meta.get_field(name)
+        raw = row.get(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        if raw in (None, ''):
+            if field.has_default():
+                continue
+            raw = None if field.null else ''
+        if name == 'isbn':
+            raw = re.sub(r'[\s-]', '', raw)
+        try:
+            values[name] = field.clean(raw, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+    for name in RELATIONS:
+        values[name] = (row.get(name) or '').strip()
+        if not values[name]:
+            errors[name] = ['This field is required.']
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+def validate_chunk(chunk):
+    """
+    Clean a chunk of (number, row) pairs. Runs in the pool workers, each on
+    its own database connection, used to look up the chunk's ISBNs once.
+    Returns (number, status, values or message) in input order, status being
+    'ok', 'duplicate' (ISBN already in the catalog) or 'invalid'.
+    """
+    from .models import Book
+
+    results = []
+    for number, row in chunk:
+        try:
+            results.append((number, 'ok', clean_row(row)))
+        except ValidationError as e:
+            message = ' '.join(f'{name}: {" ".join(messages)}' for name, messages in e.message_dict.items())
+            results.append((number, 'invalid', message))
+    isbns = [values['isbn'] for _, status, values in results if status == 'ok']
+    existing = set(Book.objects.filter(isbn__in=isbns).values_list('isbn', flat=True))
+    return [
+        (number, 'duplicate', payload['isbn']) if status == 'ok' and payload['isbn'] in existing
+        else (number, status, payload)
+        for number, status, payload in results
+    ]
+
+
+def _init_worker(database_name):
+    """Pool initializer: set Django up in the new process, on the caller's database"""
+    django.setup()
+    connections['default'].settings_dict['NAME'] = database_name
+
+
+def _validated(chunks, workers):
+    """validate_chunk() over `chunks`, in order, with at most 2 chunks per worker in flight"""
+    if workers == 1:
+        yield from map(validate_chunk, chunks)
+        return
+
+    # Spawned rather than forked, so workers never inherit the caller's open connections
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(connections['default'].settings_dict['NAME'],),
+    ) as pool:
+        in_flight = 2 * (workers or os.cpu_count() or 1)
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(validate_chunk, chunk))
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class BookWriter:
+    """Resolves the related names of cleaned rows and creates their books"""
+
+    def __init__(self):
+        from django.contrib.auth.models import User
+        from .models import Author, Editorial
+
+        self.models = {'author': Author, 'editorial': Editorial, 'seller': User}
+        self.ids = {name: {} for name in RELATIONS}
+
+    def resolve(self, name, keys):
+        """Load the ids of `keys` not seen yet; missing authors and editorials are created"""
+        model, field = self.models[name], RELATIONS[name]
+        ids = self.ids[name]
+        missing = set(keys) - set(ids)
+        if not missing:
+            return
+        for pk, key in model.objects.filter(**{f'{field}__in': missing}).order_by('-pk').values_list('pk', field):
+            ids[key] = pk
+        if name != 'seller' and missing - set(ids):
+            from .reference import reference_cache
+
+            for obj in model.objects.bulk_create([model(**{field: key}) for key in sorted(missing - set(ids))]):
+                ids[getattr(obj, field)] = obj.pk
+            # bulk_create sends no signals
+            reference_cache(model).bump()
+
+    def write(self, rows):
+        """Create the books of (number, values) rows; returns (created, [(number, message)])"""
+        from .models import Book
+
+        for name in RELATIONS:
+            self.resolve(name, {values[name] for _, values in rows})
+        books, errors = [], []
+        for number, values in rows:
+            seller_id = self.ids['seller'].get(values['seller'])
+            if seller_id is None:
+                errors.append((number, f'seller: No user named "{values["seller"]}".'))
+                continue
+            fields = {name: value for name, value in values.items() if name not in RELATIONS}
+            books.append(Book(
+                author_id=self.ids['author'][values['author']],
+                editorial_id=self.ids['editorial'][values['editorial']],
+                seller_id=seller_id,
+                **fields,
+            ))
+        Book.objects.create_many(books)
+        return len(books), errors
+
+
+def import_rows(rows, workers=None, batch_size=500):
+    """
+    Create a book per valid row of `rows` (dicts keyed by FIELDS and
+    RELATIONS). Rows are validated in chunks of `batch_size` by `workers`
+    processes (all CPUs by default; 1 validates in this process) and written
+    in feed order, one transaction per batch. Rows whose ISBN is already in
+    the catalog or earlier in the feed are skipped.
+    Returns a dict of created/duplicates/invalid counts and the row errors.
+    """
+    numbered = enumerate(rows, start=1)
+    chunks = iter(lambda: list(islice(numbered, batch_size)), [])
+    writer = BookWriter()
+    report = {'created': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+    seen = set()
+
+    for results in _validated(chunks, workers):
+        batch = []
+        for number, status, payload in results:
+            if status == 'ok' and payload['isbn'] in seen:
+                status = 'duplicate'
+            if status == 'ok':
+                seen.add(payload['isbn'])
+                batch.append((number, payload))
+            elif status == 'duplicate':
+                report['duplicates'] += 1
+            else:
+                report['invalid'] += 1
+                report['errors'].append((number, payload))
+        if batch:
+            created, errors = writer.write(batch)
+            report['created'] += created
+            report['invalid'] += len(errors)
+            report['errors'].extend(errors)
+    report['errors'].sort()
+    return report
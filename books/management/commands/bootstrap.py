@@ -0,0 +1,86 @@
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import get_resolver
+from books.catalog import catalog_version
+from books.models import Book
+from books.trending import trending_books
+
+
+class Command(BaseCommand):
+    help = (
+        'Prepares a deploy in one process: waits for the database, applies pending '
+        'migrations, seeds an empty catalog and warms up the URLconf and caches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--wait',
+            type=int,
+            default=0,
+            help='Seconds to keep retrying while the database is unreachable',
+        )
+        parser.add_argument(
+            '--collectstatic',
+            action='store_true',
+            help='Also collect static files',
+        )
+        parser.add_argument(
+            '--no-seed',
+            action='store_true',
+            help='Leave an empty catalog empty instead of running populate_db',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        connection = connections[DEFAULT_DB_ALIAS]
+        self.wait_for_database(connection, options['wait'])
+
+        if options['collectstatic']:
+            call_command('collectstatic', interactive=False, verbosity=0)
+            self.stdout.write('Collected static files')
+
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if plan:
+            self.stdout.write(f'Applying {len(plan)} migrations...')
+            call_command('migrate', interactive=False, verbosity=0)
+        else:
+            self.stdout.write('No migrations to apply')
+
+        if not options['no_seed'] and not Book.objects.exists():
+            self.stdout.write('Populating the empty catalog...')
+            call_command('populate_db', stdout=self.stdout)
+
+        self.warm_up()
+        self.stdout.write(self.style.SUCCESS(f'Bootstrapped in {time.perf_counter() - start:.1f}s'))
+
+    def wait_for_database(self, connection, seconds):
+        deadline = time.monotonic() + seconds
+        while True:
+            try:
+                connection.ensure_connection()
+                return
+            except OperationalError as e:
+                if time.monotonic() >= deadline:
+                    raise CommandError(f'Database unavailable: {e}')
+                self.stdout.write('Waiting for the database...')
+                time.sleep(1)
+
+    def warm_up(self):
+        """
+        Import every view, and fill the caches read on the first requests when
+        they are shared. A per-process cache would be thrown away when this
+        command exits; gunicorn's when_ready hook warms that one instead.
+        """
+        get_resolver().url_patterns
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            self.stdout.write('Warmed up the URLconf')
+            return
+        catalog_version()
+        trending_books()
+        self.stdout.write('Warmed up the URLconf and caches')
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from books.cleanup import cleanup_carts
+
+
+class Command(BaseCommand):
+    help = (
+        'Expires idle carts, drops items for out-of-stock books, purges empty carts '
+        'forgets expired idempotency keys and prunes processed outbox events'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idle-days',
+            type=int,
+            default=30,
+            help='Delete carts with no activity for this many days',
+        )
+        parser.add_argument(
+            '--empty-hours',
+            type=int,
+            default=24,
+            help='Only purge empty carts untouched for this many hours',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Width of the primary key range deleted per statement',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between batches',
+        )
+
+    def handle(self, *args, **options):
+        deleted = cleanup_carts(
+            idle_ttl=timedelta(days=options['idle_days']),
+            empty_min_age=timedelta(hours=options['empty_hours']),
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted['idle_carts']} idle carts, "
+            f"{deleted['unavailable_items']} items for unavailable books "
+            f"and {deleted['empty_carts']} empty carts; "
+            f"forgot {deleted['idempotency_keys']} expired idempotency keys; "
+            f"pruned {deleted['outbox_events']} processed outbox events"
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from books import trending
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the trending books ranking from recent cart and purchase activity'
+
+    def handle(self, *args, **options):
+        ranked = trending.compute()
+        self.stdout.write(self.style.SUCCESS(f'Ranked {ranked} trending books'))
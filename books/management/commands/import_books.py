@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from books import importer
+
+
+class Command(BaseCommand):
+    help = 'Imports books from a CSV feed, validating rows in parallel worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row of book fields')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes validating rows (default: one per CPU)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows validated per chunk and written per transaction',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = importer.import_rows(
+                importer.read_csv(options['path']),
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+            )
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        for number, message in report['errors'][:10]:
+            self.stdout.write(self.style.WARNING(f'Row {number}: {message}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} books "
+            f"({report['duplicates']} duplicates skipped, {report['invalid']} invalid rows)"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from books import covers
+
+
+class Command(BaseCommand):
+    help = 'Renders cover thumbnails from a directory of images named after book ISBNs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory of cover images, e.g. 9780141439518.jpg')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes rendering thumbnails (default: one per CPU)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            updated, unmatched, unreadable = covers.ingest(options['directory'], workers=options['workers'])
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        if unmatched:
+            self.stdout.write(self.style.WARNING(
+                f"No book for {len(unmatched)} images: {', '.join(unmatched[:10])}"
+            ))
+        if unreadable:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {len(unreadable)} unreadable images: {', '.join(unreadable[:10])}"
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Updated the cover of {updated} books'))
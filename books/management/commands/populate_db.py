@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from books import importer
 from books.models import Author, Editorial, Book
 from decimal import Decimal
 from datetime import date
@@ -9,6 +10,14 @@ import random
 class Command(BaseCommand):
     help = 'Populates the database with classic books, authors, and editorials'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes validating book rows (default: 1, in this process)',
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting database population...'))
 
@@ -22,7 +31,7 @@ class Command(BaseCommand):
         editorials = self.create_editorials()
 
         # Create books
-        self.create_books(authors, editorials, users)
+        self.create_books(authors, editorials, users, options['workers'])
 
         self.stdout.write(self.style.SUCCESS('Database population completed successfully!'))
 
@@ -183,7 +192,7 @@ class Command(BaseCommand):
 
         return editorials
 
-    def create_books(self, authors, editorials, users):
+    def create_books(self, authors, editorials, users, workers=1):
         """Create classic books"""
         books_data = [
             # Jane Austen books
@@ -263,16 +272,15 @@ class Command(BaseCommand):
         conditions = ['new', 'like_new', 'good', 'fair', 'poor']
         languages = ['en', 'en', 'en', 'en', 'en']  # Mostly English, but could vary
 
-        author_dict = {author.name: author for author in authors}
-
-        books_created = 0
+        rows = []
+        taken = set(Book.objects.values_list('isbn', flat=True))
         isbn_counter = 1000  # Counter to ensure unique ISBNs
         
         for book_data in books_data:
             # Generate unique ISBNs by adding variation
             base_isbn = book_data['isbn']
             # Create multiple copies of some books with different conditions
-            num_copies = random.randint(1, 3) if books_created < 50 else 1
+            num_copies = random.randint(1, 3) if len(rows) < 50 else 1
             
             for copy_num in range(num_copies):
                 # Generate unique ISBN for each copy
@@ -289,7 +297,7 @@ class Command(BaseCommand):
                     isbn_counter += 1
                 else:
                     # For first copy, use base ISBN but ensure uniqueness
-                    if Book.objects.filter(isbn=base_isbn).exists():
+                    if base_isbn in taken:
                         isbn_digits = list(base_isbn)
                         counter_str = str(isbn_counter)[-3:]
                         for i, digit in enumerate(counter_str):
@@ -319,28 +327,23 @@ class Command(BaseCommand):
                 # Random editorial
                 editorial = random.choice(editorials)
 
-                # Check if book with this ISBN already exists
-                if not Book.objects.filter(isbn=isbn).exists():
-                    book, created = Book.objects.get_or_create(
-                        isbn=isbn,
-                        defaults={
-                            'title': book_data['title'],
-                            'author': author_dict[book_data['author']],
-                            'editorial': editorial,
-                            'seller': seller,
-                            'publication_date': book_data['publication_date'],
-                            'price': price,
-                            'condition': condition,
-                            'pages': book_data['pages'],
-                            'language': random.choice(languages),
-                            'is_available': True,
-                            'description': f'A classic {book_data["title"]} by {book_data["author"]}. Condition: {condition}.'
-                        }
-                    )
-                    if created:
-                        books_created += 1
-                        if books_created <= 5 or books_created % 10 == 0:
-                            self.stdout.write(f'Created book {books_created}: {book.title}')
-
+                if isbn not in taken:
+                    taken.add(isbn)
+                    rows.append({
+                        'title': book_data['title'],
+                        'isbn': isbn,
+                        'author': book_data['author'],
+                        'editorial': editorial.name,
+                        'seller': seller.username,
+                        'publication_date': book_data['publication_date'],
+                        'price': price,
+                        'condition': condition,
+                        'pages': book_data['pages'],
+                        'language': random.choice(languages),
+                        'description': f'A classic {book_data["title"]} by {book_data["author"]}. Condition: {condition}.'
+                    })
+
+        report = importer.import_rows(rows, workers=workers)
+        books_created = report['created']
         self.stdout.write(self.style.SUCCESS(f'Created {books_created} books total'))
 
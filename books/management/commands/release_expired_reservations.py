@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from books.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Releases stock held by cart reservations that have expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Maximum number of reservations deleted per statement',
+        )
+
+    def handle(self, *args, **options):
+        deleted = release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {deleted} expired reservations'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from books.history import rollup, rollup_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Rolls book price/stock history older than the retention window up into daily rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Keep individual changes for this many days; older ones are rolled up',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of books rolled up per transaction',
+        )
+
+    def handle(self, *args, **options):
+        rolled = rollup(rollup_cutoff(options['days']), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {rolled} history rows'))
@@ -0,0 +1,59 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from books import outbox
+
+
+class Command(BaseCommand):
+    help = 'Drains the outbox, running the side effects of committed changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of events claimed per transaction',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Give up on an event after this many failed attempts',
+        )
+        parser.add_argument(
+            '--retry-delay',
+            type=float,
+            default=5.0,
+            help='Seconds before retrying a failed event, doubled after each failure',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when no event is due',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no event is due instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                claimed = outbox.process_batch(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    retry_delay=timedelta(seconds=options['retry_delay']),
+                )
+                processed += claimed
+                if claimed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} outbox events'))
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# Serves the admin's case-insensitive title prefix search ("^title"), which
+# Django runs as UPPER("title"::text) LIKE UPPER('...%'). Only PostgreSQL
+# can use a pattern-ops expression index for that.
+CREATE_INDEX = (
+    'CREATE INDEX IF NOT EXISTS book_title_upper_prefix_idx '
+    'ON books_book (UPPER(title::text) text_pattern_ops)'
+)
+DROP_INDEX = 'DROP INDEX IF EXISTS book_title_upper_prefix_idx'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_outboxevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_indexes_and_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['seller', '-created_at', '-id'], name='book_seller_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# History rows are appended in time order, so a BRIN index on recorded_at
+# stays a few pages in size while still serving the rollup's range scans.
+# PostgreSQL only; elsewhere the (book, recorded_at) index has to do.
+CREATE_BRIN_INDEX = (
+    'CREATE INDEX IF NOT EXISTS bookhistory_recorded_brin '
+    'ON books_bookhistory USING brin (recorded_at)'
+)
+DROP_BRIN_INDEX = 'DROP INDEX IF EXISTS bookhistory_recorded_brin'
+
+
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_BRIN_INDEX)
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_BRIN_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_book_seller_recent_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookDailyHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('open_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('close_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('close_quantity', models.IntegerField()),
+                ('units_sold', models.IntegerField(default=0)),
+                ('units_added', models.IntegerField(default=0)),
+                ('changes', models.IntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_history', to='books.book')),
+            ],
+            options={
+                'verbose_name_plural': 'book daily history',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('book', 'day'), name='bookdailyhistory_unique_book_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BookHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.IntegerField()),
+                ('quantity_change', models.IntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='books.book')),
+            ],
+            options={
+                'verbose_name_plural': 'book history',
+                'ordering': ['recorded_at', 'id'],
+                'indexes': [models.Index(fields=['book', 'recorded_at'], name='bookhistory_book_time_idx')],
+            },
+        ),
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_book_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(unique=True)),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trending', to='books.book')),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BookActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('adds', models.IntegerField(default=0)),
+                ('purchases', models.IntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='books.book')),
+            ],
+            options={
+                'verbose_name_plural': 'book activity',
+                'ordering': ['hour'],
+                'indexes': [models.Index(fields=['hour'], name='bookactivity_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('book', 'hour'), name='bookactivity_unique_book_hour')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:19
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_added_price(apps, schema_editor):
+    # Items already in carts are taken to have been added at today's price
+    Book = apps.get_model('books', 'Book')
+    CartItem = apps.get_model('books', 'CartItem')
+    CartItem.objects.filter(added_price__isnull=True).update(
+        added_price=Subquery(Book.objects.filter(pk=OuterRef('book_id')).values('price')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='added_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_added_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:41
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0013_book_author_editorial_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='quantity',
+            field=models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
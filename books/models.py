@@ -1,5 +1,7 @@
-from django.db import models
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Author(models.Model):
@@ -33,6 +35,51 @@ class Editorial(models.Model):
         ordering = ['name']
 
 
+class BookQuerySet(models.QuerySet):
+    """
+    Bulk writes that keep the invariants Book.save() maintains: availability
+    follows quantity, stock/price changes go to the outbox and the history
+    in the same transaction, and the catalog version is bumped on commit
+    (bulk writes send no signals).
+    """
+
+    def create_many(self, books, batch_size=500):
+        for book in books:
+            book.is_available = book.quantity > 0
+        with transaction.atomic(using=self.db):
+            created = self.bulk_create(books, batch_size=batch_size)
+            self._publish_changes(created)
+        return created
+
+    def update_many(self, books, fields, batch_size=500):
+        fields = set(fields) | {'is_available', 'updated_at'}
+        now = timezone.now()
+        for book in books:
+            book.is_available = book.quantity > 0
+            book.updated_at = now
+        with transaction.atomic(using=self.db):
+            self.bulk_update(books, sorted(fields), batch_size=batch_size)
+            self._publish_changes(books)
+        return books
+
+    def _publish_changes(self, books):
+        from .catalog import bump_catalog_version
+
+        events, history = [], []
+        for book in books:
+            changes = book.tracked_changes()
+            if changes:
+                events.append(OutboxEvent(
+                    topic=OutboxEvent.BOOK_INVENTORY_CHANGED,
+                    payload=OutboxEvent.book_payload(book, changes),
+                ))
+                history.append(BookHistory.for_change(book, changes))
+            book._remember_tracked_values()
+        OutboxEvent.objects.using(self.db).bulk_create(events)
+        BookHistory.objects.using(self.db).bulk_create(history)
+        transaction.on_commit(bump_catalog_version, using=self.db)
+
+
 class Book(models.Model):
     CONDITION_CHOICES = [
         ('new', 'New'),
@@ -46,28 +93,102 @@ class Book(models.Model):
     isbn = models.CharField(max_length=13, unique=True)
     description = models.TextField(blank=True, null=True)
     publication_date = models.DateField(blank=True, null=True)
-    price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES, default='good')
     pages = models.IntegerField(blank=True, null=True)
     language = models.CharField(max_length=50, default='en')
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='books')
     editorial = models.ForeignKey(Editorial, on_delete=models.CASCADE, related_name='books')
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='books')
-    quantity = models.IntegerField(default=1)
+    quantity = models.IntegerField(default=1, validators=[MinValueValidator(0)])
     is_available = models.BooleanField(default=True)
+    # Content hash naming the rendered cover images (see books/covers.py)
+    cover_hash = models.CharField(max_length=16, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BookQuerySet.as_manager()
+
+    # Fields whose changes are published through the outbox
+    TRACKED_FIELDS = ('quantity', 'price')
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_tracked_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Only the reloaded fields get a new baseline: an unsaved edit of any
+        # other field (e.g. when a deferred field loads) is still a change
+        self._remember_tracked_values(fields)
+
+    def _remember_tracked_values(self, fields=None):
+        # Deferred fields are not in __dict__ and are treated as unknown
+        names = self.TRACKED_FIELDS if fields is None else [name for name in self.TRACKED_FIELDS if name in fields]
+        tracked = {} if fields is None else getattr(self, '_tracked_values', {})
+        tracked.update({name: self.__dict__[name] for name in names if name in self.__dict__})
+        self._tracked_values = tracked
+
+    def tracked_changes(self):
+        """Map of tracked field -> (old, new) for values changed since loading"""
+        loaded = getattr(self, '_tracked_values', {})
+        changes = {}
+        for name in self.TRACKED_FIELDS:
+            if name not in self.__dict__:
+                continue
+            old, new = loaded.get(name), self.__dict__[name]
+            if old is None or old != new:
+                changes[name] = (old, new)
+        return changes
+
     def save(self, *args, **kwargs):
         # Update is_available based on quantity
         self.is_available = self.quantity > 0
-        super().save(*args, **kwargs)
+        changes = self.tracked_changes()
+        if kwargs.get('update_fields') is not None:
+            changes = {name: change for name, change in changes.items() if name in kwargs['update_fields']}
+        # The outbox event and history row commit or roll back together with
+        # the change itself
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if changes:
+                OutboxEvent.objects.create(
+                    topic=OutboxEvent.BOOK_INVENTORY_CHANGED,
+                    payload=OutboxEvent.book_payload(self, changes),
+                )
+                BookHistory.for_change(self, changes).save()
+        self._remember_tracked_values()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default catalog ordering, and the same restricted to books in stock
+            models.Index(fields=['-created_at'], name='book_recent_idx'),
+            models.Index(
+                fields=['-created_at'],
+                name='book_available_recent_idx',
+                condition=models.Q(is_available=True),
+            ),
+            # Equality filters of BookFilterBackend, keeping the list ordering
+            models.Index(fields=['condition', '-created_at'], name='book_condition_recent_idx'),
+            models.Index(fields=['language', '-created_at'], name='book_language_recent_idx'),
+            # Price range filters
+            models.Index(fields=['price'], name='book_price_idx'),
+            # A seller's own listings, newest first (keyset pagination)
+            models.Index(fields=['seller', '-created_at', '-id'], name='book_seller_recent_idx'),
+            # An author's and an editorial's books, newest first (keyset pagination)
+            models.Index(fields=['author', '-created_at', '-id'], name='book_author_recent_idx'),
+            models.Index(fields=['editorial', '-created_at', '-id'], name='book_editorial_recent_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name='book_quantity_non_negative'),
+            models.CheckConstraint(condition=models.Q(price__gte=0), name='book_price_non_negative'),
+        ]
 
 
 class Cart(models.Model):
@@ -87,6 +208,8 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='cart_items')
     quantity = models.IntegerField(default=1)
+    # Book price when the item was added, so checkout can report price changes
+    added_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -98,5 +221,205 @@ class CartItem(models.Model):
         return self.book.price * self.quantity
 
     class Meta:
-        unique_together = ['cart', 'book']
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'book'], name='cartitem_unique_cart_book'),
+            models.CheckConstraint(condition=models.Q(quantity__gt=0), name='cartitem_quantity_positive'),
+        ]
+
+
+class StockReservationQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class StockReservation(models.Model):
+    """Units of a book held for a cart until they are checked out or expire"""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.IntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StockReservationQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.quantity}x book {self.book_id} held for cart {self.cart_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'book'], name='reservation_unique_cart_book'),
+            models.CheckConstraint(condition=models.Q(quantity__gt=0), name='reservation_quantity_positive'),
+        ]
+        indexes = [
+            # Summing active reservations for a book
+            models.Index(fields=['book', 'expires_at'], name='reservation_book_expiry_idx'),
+            # Sweeping expired reservations
+            models.Index(fields=['expires_at'], name='reservation_expiry_idx'),
+        ]
+
+
+class OutboxEvent(models.Model):
+    """
+    Side effect to run after a change has committed, written in the same
+    transaction as the change. Drained by `manage.py run_worker`.
+    """
+    BOOK_INVENTORY_CHANGED = 'book.inventory_changed'
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    # A failed event isn't claimed again before this time (backoff)
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk}"
+
+    @staticmethod
+    def book_payload(book, changes):
+        return {
+            'book_id': book.pk,
+            'changes': {
+                name: [None if old is None else str(old), str(new)]
+                for name, (old, new) in changes.items()
+            },
+        }
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The worker only ever scans pending events, oldest first
+            models.Index(
+                fields=['id'],
+                name='outbox_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+
+class BookHistory(models.Model):
+    """
+    Append-only log of a book's price and stock, one row per change.
+    Rows older than the retention window are folded into BookDailyHistory
+    by `manage.py rollup_book_history`.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='history')
+    recorded_at = models.DateTimeField(default=timezone.now)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.IntegerField()
+    # Stock delta of this change; negative for sales, positive for restocks
+    quantity_change = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.book_id} @ {self.recorded_at}"
+
+    @classmethod
+    def for_change(cls, book, changes):
+        """Unsaved row recording `book` after the tracked `changes`"""
+        old, new = changes.get('quantity', (book.quantity, book.quantity))
+        return cls(book=book, price=book.price, quantity=book.quantity, quantity_change=new - (old or 0))
+
+    class Meta:
+        ordering = ['recorded_at', 'id']
+        indexes = [
+            # Per-book series; a BRIN index on recorded_at alone is added on
+            # PostgreSQL for range scans by the rollup (see migration 0008)
+            models.Index(fields=['book', 'recorded_at'], name='bookhistory_book_time_idx'),
+        ]
+        verbose_name_plural = 'book history'
+
+
+class BookDailyHistory(models.Model):
+    """One book's price and stock movement over a day, rolled up from BookHistory"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='daily_history')
+    day = models.DateField()
+    open_price = models.DecimalField(max_digits=10, decimal_places=2)
+    close_price = models.DecimalField(max_digits=10, decimal_places=2)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2)
+    close_quantity = models.IntegerField()
+    units_sold = models.IntegerField(default=0)
+    units_added = models.IntegerField(default=0)
+    changes = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.book_id} on {self.day}"
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'day'], name='bookdailyhistory_unique_book_day'),
+        ]
+        verbose_name_plural = 'book daily history'
+
+
+class BookActivity(models.Model):
+    """
+    Cart adds and units purchased per book and hour, fed by the cart views.
+    Read and pruned by `manage.py compute_trending`.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='activity')
+    hour = models.DateTimeField()
+    adds = models.IntegerField(default=0)
+    purchases = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.book_id} @ {self.hour}"
+
+    class Meta:
+        ordering = ['hour']
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'hour'], name='bookactivity_unique_book_hour'),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='bookactivity_hour_idx'),
+        ]
+        verbose_name_plural = 'book activity'
+
+
+class TrendingBook(models.Model):
+    """Precomputed trending ranking, rewritten as a whole by `manage.py compute_trending`"""
+    rank = models.PositiveIntegerField(unique=True)
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, related_name='trending')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"#{self.rank} {self.book_id}"
+
+    class Meta:
+        ordering = ['rank']
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response to a cart mutation sent with an Idempotency-Key header, replayed
+    when the client retries with the same key (see books/idempotency.py)
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    # Hash of the method, path and payload the key was first used with
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
+
+    class Meta:
+        constraints = [
+            # Also the index of the lookup done for every keyed request
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            # Sweeping expired keys
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
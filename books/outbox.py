@@ -0,0 +1,76 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# topic -> list of callables taking the event payload
+_handlers = {}
+
+
+def handler(topic):
+    """
+    Register a function to run for every outbox event of `topic`:
+
+        @outbox.handler(OutboxEvent.BOOK_INVENTORY_CHANGED)
+        def reindex_book(payload):
+            ...
+    """
+    def register(func):
+        _handlers.setdefault(topic, []).append(func)
+        return func
+    return register
+
+
+def handlers_for(topic):
+    return list(_handlers.get(topic, []))
+
+
+def retry_backoff(attempts, retry_delay):
+    """Wait before the next try of an event that failed `attempts` times: doubles each time"""
+    return retry_delay * 2 ** (attempts - 1)
+
+
+def process_batch(batch_size=100, max_attempts=5, retry_delay=timedelta(seconds=5)):
+    """
+    Run the handlers of up to `batch_size` pending events and mark them
+    processed. Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so
+    several workers can drain the outbox without running an event twice.
+    A failed event is retried after a backoff starting at `retry_delay`.
+    Returns the number of events claimed.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, attempts__lt=max_attempts)
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .order_by('id')[:batch_size]
+        )
+        done = []
+        for event in events:
+            try:
+                # A failing handler only rolls back its own side effects
+                with transaction.atomic():
+                    for func in handlers_for(event.topic):
+                        func(event.payload)
+            except Exception as e:
+                logger.exception(f"Outbox event {event.pk} ({event.topic}) failed")
+                event.attempts += 1
+                event.last_error = str(e)
+                event.next_attempt_at = now + retry_backoff(event.attempts, retry_delay)
+                event.save(update_fields=['attempts', 'last_error', 'next_attempt_at'])
+            else:
+                done.append(event.pk)
+
+        if done:
+            OutboxEvent.objects.filter(pk__in=done).update(
+                processed_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+    return len(events)
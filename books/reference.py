@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Author, Editorial
+
+
+class ReferenceCache:
+    """
+    Two-level cache of a small, rarely changing table. Each process keeps an
+    LRU of objects by primary key and of rendered lists in memory; rendered
+    lists are also shared with the other processes through the cache. Both
+    levels are keyed by a version number in the shared cache, which every
+    change to the table bumps, so a process notices a change made by any
+    other at its next lookup and drops its local entries.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.version_key = f'reference:{model._meta.label_lower}:version'
+        self.version = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            # Start from the clock so a lost key never reuses an old version
+            cache.add(self.version_key, time.time_ns() // 1000, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def bump(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            self.current_version()
+
+    def changed(self, sender, **kwargs):
+        """
+        post_save/post_delete receiver for the cached model. Bumps right away,
+        so this transaction doesn't read stale entries, and again on commit,
+        as other processes may have cached the old rows in between.
+        """
+        self.bump()
+        transaction.on_commit(self.bump)
+
+    def sync(self):
+        """Drop the local entries if the table changed since they were stored"""
+        version = self.current_version()
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+        return version
+
+    def lookup(self, key):
+        with self.lock:
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self.entries[key]
+
+    def store(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.REFERENCE_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def in_bulk(self, pks):
+        """{pk: object} for the `pks` that exist, querying only the ones not in memory"""
+        self.sync()
+        found, missing = {}, []
+        for pk in pks:
+            obj = self.lookup(('pk', pk))
+            if obj is None:
+                missing.append(pk)
+            else:
+                found[pk] = obj
+        if missing:
+            for pk, obj in self.model._default_manager.in_bulk(missing).items():
+                self.store(('pk', pk), obj)
+                found[pk] = obj
+        return found
+
+    def get(self, pk):
+        try:
+            return self.in_bulk([pk])[pk]
+        except KeyError:
+            raise self.model.DoesNotExist(f'{self.model.__name__} {pk} does not exist') from None
+
+    def rendered(self, key, render):
+        """
+        The result of `render()` for `key`, from memory, else from the shared
+        cache, else rendered and stored in both
+        """
+        version = self.sync()
+        data = self.lookup(('rendered', key))
+        if data is None:
+            shared_key = (
+                f'reference:{self.model._meta.label_lower}:{version}:'
+                f'{hashlib.md5(repr(key).encode()).hexdigest()}'
+            )
+            data = cache.get(shared_key)
+            if data is None:
+                data = render()
+                cache.set(shared_key, data, settings.REFERENCE_CACHE_TIMEOUT)
+            self.store(('rendered', key), data)
+        return data
+
+
+authors = ReferenceCache(Author)
+editorials = ReferenceCache(Editorial)
+
+CACHES = {Author: authors, Editorial: editorials}
+
+
+def reference_cache(model):
+    """The ReferenceCache of `model`, or None if it isn't cached"""
+    return CACHES.get(model)
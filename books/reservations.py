@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import StockReservation
+
+
+def reservation_ttl():
+    """How long units added to a cart stay held for it"""
+    return timedelta(seconds=getattr(settings, 'CART_RESERVATION_TTL', 15 * 60))
+
+
+def reserved_quantities(book_ids, exclude_cart=None):
+    """
+    Map book id -> units held by active reservations, in a single query
+    over the (book, expires_at) index.
+    """
+    reservations = StockReservation.objects.active().filter(book_id__in=book_ids)
+    if exclude_cart is not None:
+        reservations = reservations.exclude(cart=exclude_cart)
+    rows = reservations.values('book_id').annotate(total=Sum('quantity'))
+    return {row['book_id']: row['total'] for row in rows}
+
+
+def available_quantity(book, exclude_cart=None):
+    """Stock of `book` not held by other carts"""
+    reserved = reserved_quantities([book.id], exclude_cart=exclude_cart).get(book.id, 0)
+    return max(book.quantity - reserved, 0)
+
+
+def reserve(cart, book, quantity):
+    """Hold `quantity` units of `book` for `cart`, restarting the expiry"""
+    StockReservation.objects.update_or_create(
+        cart=cart,
+        book=book,
+        defaults={'quantity': quantity, 'expires_at': timezone.now() + reservation_ttl()},
+    )
+
+
+def reserve_many(cart, quantities):
+    """Hold {book id: quantity} for `cart` with one upsert, restarting the expiry"""
+    expires_at = timezone.now() + reservation_ttl()
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(cart=cart, book_id=book_id, quantity=quantity, expires_at=expires_at)
+            for book_id, quantity in quantities.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['cart', 'book'],
+        update_fields=['quantity', 'expires_at', 'updated_at'],
+    )
+
+
+def release(cart, book=None):
+    """Drop the reservations of `cart`, or only the one for `book`"""
+    reservations = StockReservation.objects.filter(cart=cart)
+    if book is not None:
+        reservations = reservations.filter(book=book)
+    reservations.delete()
+
+
+def release_expired(batch_size=1000):
+    """
+    Delete expired reservations in batches of at most `batch_size` rows so a
+    large backlog never holds locks for long. Returns the number deleted.
+    """
+    deleted = 0
+    while True:
+        ids = list(StockReservation.objects.expired().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        # Re-check expiry so a reservation refreshed meanwhile survives
+        count, _ = StockReservation.objects.expired().filter(id__in=ids).delete()
+        deleted += count
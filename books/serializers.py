@@ -1,36 +1,342 @@
-from rest_framework import serializers
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
 from .models import Author, Editorial, Book, Cart, CartItem
+from .reference import reference_cache
+
+
+def parse_field_tree(value):
+    """
+    Turn 'id,author.name,author.id' into {'id': {}, 'author': {'name': {}, 'id': {}}}.
+    An empty dict means "everything below this field".
+    """
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients trim read payloads with `?fields=` and opt into extra nested
+    objects with `?expand=`.
+
+    `fields` is a comma-separated whitelist; dotted names select fields of a
+    nested serializer (`?fields=id,title,author.name`). `expand` names entries
+    of `Meta.expandable_fields`, which are left out unless asked for. Nested
+    serializers get the part of the selection under their own name, and
+    `narrow_queryset()` loads only the columns the selection reads.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected, expanded = self.get_sparse_selection()
+
+        for name, serializer_class in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expanded:
+                fields[name] = serializer_class(read_only=True)
+
+        if selected:
+            fields = {name: field for name, field in fields.items() if name in selected}
+
+        for name, field in fields.items():
+            nested = getattr(field, 'child', field)
+            if isinstance(nested, SparseFieldsetMixin):
+                nested._sparse_selection = (selected.get(name) or None, expanded.get(name, {}))
+        return fields
+
+    def get_sparse_selection(self):
+        """(fields tree or None for all, expand tree) for this serializer"""
+        if hasattr(self, '_sparse_selection'):
+            selected, expanded = self._sparse_selection
+            return selected or {}, expanded
+        request = self.context.get('request')
+        # Writes always validate and echo the full representation
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return {}, {}
+        return (
+            parse_field_tree(request.query_params.get('fields')),
+            parse_field_tree(request.query_params.get('expand')),
+        )
+
+    def get_model_paths(self, prefix=''):
+        """
+        (select_related paths, only() paths) needed to render the selected
+        fields, or None when some field reads data that can't be expressed
+        as a column path (e.g. a reverse relation).
+        """
+        relations, columns = [], []
+        dependencies = getattr(self.Meta, 'field_dependencies', {})
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in dependencies:
+                    return None
+                paths = [prefix + path for path in dependencies[name]]
+            elif isinstance(field, serializers.ListSerializer) or field.source == '*':
+                return None
+            else:
+                paths = [prefix + field.source.replace('.', '__')]
+
+            if isinstance(field, SparseFieldsetMixin):
+                nested = field.get_model_paths(paths[0] + '__')
+                if nested is None:
+                    return None
+                relations.append(paths[0])
+                relations.extend(nested[0])
+                columns.append(paths[0])
+                columns.extend(nested[1])
+                continue
+
+            for path in paths:
+                # Every step before the last column is a forward relation
+                steps = path.split('__')
+                for i in range(1, len(steps)):
+                    relation = '__'.join(steps[:i])
+                    if relation not in relations:
+                        relations.append(relation)
+                        columns.append(relation)
+                columns.append(path)
+        return relations, columns
+
+    def narrow_queryset(self, queryset, *required):
+        """
+        Join the relations and load only the columns the selected fields read,
+        plus any `required` by the caller (e.g. the FK a prefetch joins on).
+        """
+        paths = self.get_model_paths()
+        if paths is None:
+            return queryset
+        relations, columns = paths
+        return queryset.select_related(*relations).only(*columns, *required)
+
+
+# Field types whose DRF representation of a value loaded from the database is
+# the value itself
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.ChoiceField, serializers.EmailField, serializers.URLField,
+)
+
+
+def _iso_utc_datetime(value):
+    return value.astimezone(datetime.timezone.utc).isoformat()[:-6] + 'Z'
+
+
+def _decimal_converter(field):
+    if field.decimal_places is None:
+        return field.to_representation
+    exponent = Decimal('.1') ** field.decimal_places
+    return lambda value: '{:f}'.format(value.quantize(exponent))
+
 
+def _fast_converter(field):
+    """
+    A cheaper callable equivalent to `field.to_representation` for the
+    values `.values()` returns under the default REST_FRAMEWORK settings.
+    None means the value is already its own representation.
+    """
+    if isinstance(field, PASSTHROUGH_FIELDS) and not isinstance(field, serializers.MultipleChoiceField):
+        return None
+    if isinstance(field, serializers.DecimalField):
+        if field.localize or not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+            return field.to_representation
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        iso = getattr(field, 'format', api_settings.DATETIME_FORMAT) == 'iso-8601'
+        if iso and settings.USE_TZ and timezone.get_current_timezone_name() == 'UTC':
+            return _iso_utc_datetime
+        return field.to_representation
+    if isinstance(field, serializers.DateField):
+        if getattr(field, 'format', api_settings.DATE_FORMAT) == 'iso-8601':
+            return datetime.date.isoformat
+        return field.to_representation
+    return field.to_representation
 
-class UserSerializer(serializers.ModelSerializer):
+
+class ValuesPlan:
+    """
+    Precompiled read path for a serializer made only of flat fields: renders
+    plain dicts straight from `QuerySet.values()` rows, skipping model
+    instances and DRF's per-object field machinery. Use `compile()`, which
+    returns None for serializers that have nested or computed fields.
+    """
+
+    def __init__(self, fields):
+        # [(output name, values() key, converter or None)]
+        self.fields = fields
+        self.keys = list(dict.fromkeys(key for _, key, _ in fields))
+
+    @classmethod
+    def compile(cls, serializer):
+        fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if (isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField))
+                    or field.source == '*'):
+                return None
+            fields.append((name, field.source.replace('.', '__'), _fast_converter(field)))
+        return cls(fields)
+
+    def render(self, rows):
+        fields = self.fields
+        data = []
+        for row in rows:
+            item = {}
+            for name, key, convert in fields:
+                value = row[key]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
         read_only_fields = ['id']
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Author
         fields = ['id', 'name', 'bio', 'birth_date', 'nationality', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class EditorialSerializer(serializers.ModelSerializer):
+class EditorialSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Editorial
         fields = ['id', 'name', 'address', 'phone', 'email', 'website', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that, inside a BookBulkSerializer, resolves against
+    the objects the list serializer fetched with one IN query per relation.
+    Cached reference tables (authors, editorials) resolve from memory.
+    """
+
+    def in_bulk(self, pks):
+        reference = reference_cache(self.get_queryset().model)
+        if reference is not None:
+            return reference.in_bulk(pks)
+        return self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        related = self.context.get('bulk_related', {}).get(self.field_name)
+        if related is None and reference_cache(self.get_queryset().model) is None:
+            return super().to_internal_value(data)
+        # to_python() would take True/False for 1/0
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if related is None:
+            related = self.in_bulk([pk])
+        if pk not in related:
+            self.fail('does_not_exist', pk_value=data)
+        return related[pk]
+
+
+class BookBulkSerializer(serializers.ListSerializer):
+    """
+    Validates and writes many books at once. Related objects and ISBN
+    uniqueness are checked with one query each for the whole list instead of
+    once per item, and rows are written with bulk_create/bulk_update.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', settings.BOOK_BULK_MAX_ITEMS)
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        # Replaced by the single query in validate_unique_isbns()
+        isbn = self.child.fields['isbn']
+        isbn.validators = [v for v in isbn.validators if not isinstance(v, UniqueValidator)]
+        if isinstance(data, list):
+            self._context['bulk_related'] = {
+                name: field.in_bulk(self.collect_pks(data, name, field))
+                for name, field in self.child.fields.items()
+                if isinstance(field, BulkPrimaryKeyRelatedField)
+            }
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self._context.pop('bulk_related', None)
+
+    @staticmethod
+    def collect_pks(data, name, field):
+        to_python = field.get_queryset().model._meta.pk.to_python
+        pks = set()
+        for item in data:
+            try:
+                if isinstance(item[name], bool):
+                    continue
+                pks.add(to_python(item[name]))
+            except (KeyError, TypeError, ValueError, DjangoValidationError):
+                # Reported by the field itself
+                continue
+        return pks
+
+    def validate(self, attrs):
+        self.validate_unique_isbns(attrs)
+        return attrs
+
+    def validate_unique_isbns(self, attrs):
+        if self.instance is None:
+            isbns = [item['isbn'] for item in attrs if 'isbn' in item]
+            existing = Book.objects.filter(isbn__in=isbns)
+        else:
+            # The ISBNs the batch will have once updated, so a book keeping
+            # its ISBN clashes with another book of the batch moving onto it
+            isbns = [item.get('isbn', book.isbn) for book, item in zip(self.instance, attrs)]
+            changed = [isbn for book, isbn in zip(self.instance, isbns) if isbn != book.isbn]
+            # The batch is written with one UPDATE, which checks uniqueness
+            # row by row: an ISBN held by any other book is taken, even if
+            # that book gives it up in the same batch
+            existing = Book.objects.filter(isbn__in=changed)
+        duplicates = {isbn for isbn in isbns if isbns.count(isbn) > 1}
+        duplicates.update(existing.values_list('isbn', flat=True))
+        if duplicates:
+            raise serializers.ValidationError(
+                {'isbn': [f'A book with ISBN {isbn} already exists.' for isbn in sorted(duplicates)]}
+            )
+
+    def create(self, validated_data):
+        return Book.objects.create_many([Book(**attrs) for attrs in validated_data])
+
+    def update(self, instances, validated_data):
+        """`instances` must be in the same order as the validated items"""
+        fields = set()
+        for book, attrs in zip(instances, validated_data):
+            for name, value in attrs.items():
+                setattr(book, name, value)
+                fields.add(name)
+        return Book.objects.update_many(instances, fields)
+
+
+class BookSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = AuthorSerializer(read_only=True)
-    author_id = serializers.PrimaryKeyRelatedField(queryset=Author.objects.all(), source='author', write_only=True)
+    author_id = BulkPrimaryKeyRelatedField(queryset=Author.objects.all(), source='author', write_only=True)
     editorial = EditorialSerializer(read_only=True)
-    editorial_id = serializers.PrimaryKeyRelatedField(queryset=Editorial.objects.all(), source='editorial', write_only=True)
+    editorial_id = BulkPrimaryKeyRelatedField(queryset=Editorial.objects.all(), source='editorial', write_only=True)
     seller = UserSerializer(read_only=True)
-    seller_id = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), source='seller', write_only=True, required=False)
+    seller_id = BulkPrimaryKeyRelatedField(queryset=User.objects.all(), source='seller', write_only=True, required=False)
 
     class Meta:
         model = Book
@@ -38,9 +344,10 @@ class BookSerializer(serializers.ModelSerializer):
             'id', 'title', 'isbn', 'description', 'publication_date', 'price',
             'condition', 'pages', 'language', 'author', 'author_id',
             'editorial', 'editorial_id', 'seller', 'seller_id',
-            'quantity', 'is_available', 'created_at', 'updated_at'
+            'quantity', 'is_available', 'cover_hash', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'cover_hash', 'created_at', 'updated_at']
+        list_serializer_class = BookBulkSerializer
 
     def create(self, validated_data):
         # Set seller to current user if not provided
@@ -50,7 +357,7 @@ class BookSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class BookListSerializer(serializers.ModelSerializer):
+class BookListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Simplified serializer for list views"""
     author_name = serializers.CharField(source='author.name', read_only=True)
     editorial_name = serializers.CharField(source='editorial.name', read_only=True)
@@ -60,11 +367,24 @@ class BookListSerializer(serializers.ModelSerializer):
         model = Book
         fields = [
             'id', 'title', 'isbn', 'price', 'condition', 'quantity', 'is_available',
-            'author_name', 'editorial_name', 'seller_username', 'created_at'
+            'author_name', 'editorial_name', 'seller_username', 'cover_hash', 'created_at'
         ]
+        expandable_fields = {
+            'author': AuthorSerializer,
+            'editorial': EditorialSerializer,
+            'seller': UserSerializer,
+        }
+
+
+class SellerBookSerializer(BookListSerializer):
+    """A seller's own listing, with the units other users hold in their carts"""
+    in_carts = serializers.IntegerField(read_only=True)
+
+    class Meta(BookListSerializer.Meta):
+        fields = BookListSerializer.Meta.fields + ['in_carts']
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
     book_id = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all(), source='book', write_only=True)
     subtotal = serializers.SerializerMethodField()
@@ -73,12 +393,13 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ['id', 'book', 'book_id', 'quantity', 'subtotal', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        field_dependencies = {'subtotal': ['quantity', 'book__price']}
 
     def get_subtotal(self, obj):
         return obj.get_subtotal()
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total = serializers.SerializerMethodField()
 
@@ -88,5 +409,7 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
     def get_total(self, obj):
-        return obj.get_total()
+        # Set by cart mutations that return the cart (CartViewSet.cart_response)
+        total = getattr(obj, 'items_total', None)
+        return obj.get_total() if total is None else total
 
@@ -1,9 +1,37 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest.mock import patch
+import brotli
+from PIL import Image
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from decimal import Decimal
-from .models import Author, Editorial, Book, Cart, CartItem
+from . import catalog, cleanup, covers, guest_cart, history, importer, outbox, reference, trending
+from .models import (
+    Author, Editorial, Book, Cart, CartItem, StockReservation, OutboxEvent,
+    BookHistory, BookDailyHistory, BookActivity, TrendingBook, IdempotencyKey
+)
+from .pagination import EstimatedCountPaginator
+from .renderers import FastJSONRenderer
+from .serializers import (
+    AuthorSerializer, EditorialSerializer, BookSerializer, BookListSerializer,
+    CartItemSerializer, ValuesPlan
+)
+from .throttling import AnonCatalogThrottle, LoginIPThrottle, LoginUsernameThrottle, CheckoutThrottle
 
 
 class AuthorTests(TestCase):
@@ -419,10 +447,1625 @@ class CartTests(TestCase):
         response = self.client.post('/api/cart/checkout/')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
     
-    def test_cart_requires_authentication(self):
-        """Test that cart endpoints require authentication"""
-        response = self.client.get('/api/cart/')
+    def test_checkout_requires_authentication(self):
+        """Test that guests can't check out"""
+        response = self.client.post('/api/cart/checkout/')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
-        
-        response = self.client.post('/api/cart/add_item/', {'book_id': 1, 'quantity': 1})
+
+
+class ThrottlingTests(TestCase):
+    """Test per-scope request throttling"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_sliding_window_weighs_previous_window(self):
+        """Requests from the previous window still count while they overlap"""
+        throttle = LoginIPThrottle()
+        throttle.num_requests, throttle.duration = 10, 60
+        throttle.previous, throttle.current = 10, 0
+        throttle.elapsed = 30  # half of the previous window still overlaps
+        self.assertEqual(throttle.estimated_count(), 5)
+        throttle.elapsed = 57
+        self.assertLess(throttle.estimated_count(), 1)
+
+    def test_client_address_not_spoofable(self):
+        """Only the X-Forwarded-For entries added by trusted proxies identify a client"""
+        throttle = LoginIPThrottle()
+        request = RequestFactory().get('/api/token/login/')
+        request.META.update(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7')
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 0}):
+            self.assertEqual(throttle.get_ident(request), '10.0.0.1')
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            self.assertEqual(throttle.get_ident(request), '203.0.113.7')
+
+    def test_login_throttled_per_username(self):
+        """Repeated failed logins for one username are throttled with Retry-After"""
+        with patch.object(LoginUsernameThrottle, 'THROTTLE_RATES', {'login_username': '3/min'}):
+            for _ in range(3):
+                response = self.client.post('/api/auth/login/', {'username': 'buyer', 'password': 'wrong'})
+                self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            response = self.client.post('/api/auth/login/', {'username': 'BUYER', 'password': 'wrong'})
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertIn('Retry-After', response)
+            # Another username from the same address is not affected
+            response = self.client.post('/api/auth/login/', {'username': 'other', 'password': 'wrong'})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_anonymous_catalog_reads_throttled(self):
+        """Anonymous catalog reads are throttled, authenticated reads are not"""
+        with patch.object(AnonCatalogThrottle, 'THROTTLE_RATES', {'anon_catalog': '2/min'}):
+            self.assertEqual(self.client.get('/api/books/').status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get('/api/authors/').status_code, status.HTTP_200_OK)
+            response = self.client.get('/api/books/')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertGreater(int(response['Retry-After']), 0)
+
+            self.client.force_authenticate(user=self.user)
+            self.assertEqual(self.client.get('/api/books/').status_code, status.HTTP_200_OK)
+
+    def test_checkout_throttled(self):
+        """Checkout attempts are throttled per user"""
+        self.client.force_authenticate(user=self.user)
+        with patch.object(CheckoutThrottle, 'THROTTLE_RATES', {'checkout': '1/min'}):
+            response = self.client.post('/api/cart/checkout/')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.client.post('/api/cart/checkout/')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            # Reading the cart is never throttled
+            self.assertEqual(self.client.get('/api/cart/').status_code, status.HTTP_200_OK)
+
+
+class StockReservationTests(TestCase):
+    """Test stock held by cart reservations"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.buyer = User.objects.create_user(username='buyer', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        seller = User.objects.create_user(username='seller', password='pass')
+        self.book = Book.objects.create(
+            title='Last Copies',
+            isbn='3333333333333',
+            price=Decimal('10.00'),
+            author=Author.objects.create(name='Author'),
+            editorial=Editorial.objects.create(name='Editorial'),
+            seller=seller,
+            quantity=2
+        )
+
+    def test_add_item_reserves_stock(self):
+        """Units in one cart cannot be added to another"""
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post('/api/cart/add_item/', {'book_id': self.book.id, 'quantity': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        reservation = StockReservation.objects.get(book=self.book)
+        self.assertEqual(reservation.quantity, 2)
+
+        self.client.force_authenticate(user=self.other)
+        response = self.client.post('/api/cart/add_item/', {'book_id': self.book.id, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Only 0 copies available', response.data['error'])
+
+    def test_expired_reservation_frees_stock(self):
+        """Expired reservations no longer hold stock"""
+        self.client.force_authenticate(user=self.buyer)
+        self.client.post('/api/cart/add_item/', {'book_id': self.book.id, 'quantity': 2})
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.client.force_authenticate(user=self.other)
+        response = self.client.post('/api/cart/add_item/', {'book_id': self.book.id, 'quantity': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # The first cart can no longer check out the copies it let go of
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post('/api/cart/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_remove_and_checkout_release_reservations(self):
+        """Removing an item or checking out drops its reservation"""
+        self.client.force_authenticate(user=self.buyer)
+        self.client.post('/api/cart/add_item/', {'book_id': self.book.id, 'quantity': 1})
+        self.client.delete(f'/api/cart/remove_item/?book_id={self.book.id}')
+        self.assertFalse(StockReservation.objects.exists())
+
+        self.client.post('/api/cart/add_item/', {'book_id': self.book.id, 'quantity': 1})
+        response = self.client.post('/api/cart/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_expired_command(self):
+        """The sweeper deletes only expired reservations"""
+        cart = Cart.objects.create(user=self.buyer)
+        other_cart = Cart.objects.create(user=self.other)
+        StockReservation.objects.create(
+            cart=cart, book=self.book, quantity=1,
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        StockReservation.objects.create(
+            cart=other_cart, book=self.book, quantity=1,
+            expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        out = StringIO()
+        call_command('release_expired_reservations', '--batch-size', '1', stdout=out)
+        self.assertIn('Released 1 expired reservations', out.getvalue())
+        self.assertEqual(list(StockReservation.objects.values_list('cart', flat=True)), [other_cart.id])
+
+
+class OutboxTests(TestCase):
+    """Test the transactional outbox and its worker"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.buyer = User.objects.create_user(username='buyer', password='testpass123')
+        self.book = Book.objects.create(
+            title='Outbox Book',
+            isbn='4444444444444',
+            price=Decimal('12.50'),
+            author=Author.objects.create(name='Author'),
+            editorial=Editorial.objects.create(name='Editorial'),
+            seller=User.objects.create_user(username='seller', password='pass'),
+            quantity=3
+        )
+        OutboxEvent.objects.all().delete()
+
+    def test_save_records_stock_and_price_changes(self):
+        """Saving a book writes an event only when stock or price changed"""
+        self.book.title = 'Renamed'
+        self.book.save()
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        self.book.price = Decimal('15.00')
+        self.book.save()
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.topic, OutboxEvent.BOOK_INVENTORY_CHANGED)
+        self.assertEqual(event.payload['changes'], {'price': ['12.50', '15.00']})
+
+    def test_checkout_records_events(self):
+        """Checkout writes one event per book bought"""
+        self.client.force_authenticate(user=self.buyer)
+        self.client.post('/api/cart/add_item/', {'book_id': self.book.id, 'quantity': 2})
+        self.client.post('/api/cart/checkout/')
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.payload['book_id'], self.book.id)
+        self.assertEqual(event.payload['changes'], {'quantity': ['3', '1']})
+
+    def test_partial_refresh_keeps_unsaved_changes(self):
+        """Reloading other fields, or a deferred one, doesn't hide an edit"""
+        book = Book.objects.get(pk=self.book.pk)
+        book.price = Decimal('99.00')
+        book.refresh_from_db(fields=['title'])
+        book.save()
+
+        book = Book.objects.only('id', 'price').get(pk=self.book.pk)
+        book.price = Decimal('98.00')
+        book.quantity  # loads the deferred field
+        book.save()
+
+        changes = [event.payload['changes'] for event in OutboxEvent.objects.order_by('id')]
+        self.assertEqual([change['price'][1] for change in changes], ['99.00', '98.00'])
+        self.assertEqual(BookHistory.objects.filter(book=self.book).count(), 3)
+
+    def test_worker_runs_handlers_once(self):
+        """The worker runs handlers and marks events processed"""
+        seen = []
+        self.book.quantity = 0
+        self.book.save()
+        with patch.dict(outbox._handlers, {OutboxEvent.BOOK_INVENTORY_CHANGED: [seen.append]}):
+            call_command('run_worker', '--once', stdout=StringIO())
+            call_command('run_worker', '--once', stdout=StringIO())
+        self.assertEqual(len(seen), 1)
+        self.assertIsNotNone(OutboxEvent.objects.get().processed_at)
+
+    def test_worker_retries_failed_events(self):
+        """A failing handler leaves the event pending with the error recorded"""
+        def fail(payload):
+            raise RuntimeError('search is down')
+
+        self.book.quantity = 0
+        self.book.save()
+        with patch.dict(outbox._handlers, {OutboxEvent.BOOK_INVENTORY_CHANGED: [fail]}):
+            outbox.process_batch()
+            # Not claimed again until its backoff has passed
+            self.assertEqual(outbox.process_batch(), 0)
+        event = OutboxEvent.objects.get()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'search is down')
+
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        with patch.dict(outbox._handlers, {OutboxEvent.BOOK_INVENTORY_CHANGED: [fail]}):
+            self.assertEqual(outbox.process_batch(retry_delay=timedelta(seconds=10)), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 2)
+        # The delay doubles after each failure
+        self.assertGreater(event.next_attempt_at, timezone.now() + timedelta(seconds=19))
+
+
+class AdminTests(TestCase):
+    """Test admin changelists stay cheap as tables grow"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='pass', email='admin@example.com')
+        self.client.force_login(self.admin)
+
+    def create_book(self, n):
+        seller = User.objects.create_user(username=f'seller{n}', password='pass')
+        book = Book.objects.create(
+            title=f'Book {n}',
+            isbn=f'{n:013d}',
+            price=Decimal('10.00'),
+            author=Author.objects.create(name=f'Author {n}'),
+            editorial=Editorial.objects.create(name=f'Editorial {n}'),
+            seller=seller,
+        )
+        cart = Cart.objects.create(user=seller)
+        CartItem.objects.create(cart=cart, book=book)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Book and cart item changelists use a constant number of queries"""
+        self.create_book(1)
+        book_queries = self.changelist_queries('/admin/books/book/')
+        item_queries = self.changelist_queries('/admin/books/cartitem/')
+        for n in range(2, 6):
+            self.create_book(n)
+        self.assertEqual(self.changelist_queries('/admin/books/book/'), book_queries)
+        self.assertEqual(self.changelist_queries('/admin/books/cartitem/'), item_queries)
+
+    def test_search_by_isbn_and_title_prefix(self):
+        """Admin search matches exact ISBNs and title prefixes"""
+        self.create_book(1)
+        self.create_book(2)
+        response = self.client.get('/admin/books/book/', {'q': f'{2:013d}'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get('/admin/books/book/', {'q': 'book'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_estimated_paginator_falls_back_to_count(self):
+        """Without planner statistics the paginator counts exactly"""
+        self.create_book(1)
+        paginator = EstimatedCountPaginator(Book.objects.all(), 20)
+        self.assertEqual(paginator.count, 1)
+
+
+class SparseFieldsetTests(TestCase):
+    """Test ?fields= and ?expand= on read endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        self.author = Author.objects.create(name='Author Name', bio='A very long bio')
+        self.book = Book.objects.create(
+            title='Sparse Book',
+            isbn='5555555555555',
+            price=Decimal('9.99'),
+            author=self.author,
+            editorial=Editorial.objects.create(name='Editorial Name'),
+            seller=User.objects.create_user(username='seller', password='pass'),
+            quantity=4
+        )
+
+    def test_list_fields(self):
+        """Only the requested fields are returned"""
+        response = self.client.get('/api/books/', {'fields': 'id,title,author_name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            dict(response.data['results'][0]),
+            {'id': self.book.id, 'title': 'Sparse Book', 'author_name': 'Author Name'}
+        )
+
+    def test_list_expand_nested_fields(self):
+        """Expandable relations are added on demand and can be trimmed"""
+        response = self.client.get('/api/books/')
+        self.assertNotIn('author', response.data['results'][0])
+        response = self.client.get('/api/books/', {'expand': 'author', 'fields': 'id,author.name'})
+        self.assertEqual(response.data['results'][0]['author'], {'name': 'Author Name'})
+
+    def test_detail_nested_fields_narrow_query(self):
+        """Nested selections skip unrequested columns such as the author bio"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/books/{self.book.id}/', {'fields': 'title,author.name'})
+        self.assertEqual(response.data, {'title': 'Sparse Book', 'author': {'name': 'Author Name'}})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('bio', queries[0]['sql'])
+        self.assertNotIn('description', queries[0]['sql'])
+
+    def test_cart_items_fields(self):
+        """Cart items are fetched in one query whatever their count"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, book=self.book, quantity=2)
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/cart/', {'fields': 'total,items.quantity,items.subtotal,items.book.title'})
+        self.assertEqual(response.data['items'][0], {'book': {'title': 'Sparse Book'}, 'quantity': 2, 'subtotal': Decimal('19.98')})
+        self.assertEqual(response.data['total'], Decimal('19.98'))
+        item_queries = [q['sql'] for q in queries if 'books_cartitem' in q['sql']]
+        self.assertEqual(len(item_queries), 1)
+        self.assertNotIn('books_author', item_queries[0])
+
+    def test_fields_ignored_on_write(self):
+        """Writes validate and return the full representation"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/authors/?fields=name', {'name': 'New Author'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('created_at', response.data)
+
+
+class FastReadPathTests(TestCase):
+    """Test the .values() list path and orjson renderer match DRF output"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = Author.objects.create(name='Autor Ñandú', bio='Line break', birth_date=date(1900, 1, 2))
+        Author.objects.create(name='No Details')
+        self.editorial = Editorial.objects.create(name='Editorial', website='https://example.com')
+        self.seller = User.objects.create_user(username='seller', password='pass')
+        for n in range(3):
+            Book.objects.create(
+                title=f'Book {n}',
+                isbn=f'66666666666{n:02d}',
+                price=Decimal('7.50') + n,
+                author=self.author,
+                editorial=self.editorial,
+                seller=self.seller,
+                quantity=n
+            )
+
+    def test_values_plan_matches_serializer(self):
+        """Plans render the same data as the serializers they were compiled from"""
+        cases = [
+            (BookListSerializer, Book.objects.all()),
+            (AuthorSerializer, Author.objects.all()),
+            (EditorialSerializer, Editorial.objects.all()),
+        ]
+        for serializer_class, queryset in cases:
+            plan = ValuesPlan.compile(serializer_class())
+            self.assertIsNotNone(plan)
+            expected = serializer_class(queryset, many=True).data
+            self.assertEqual(plan.render(queryset.values(*plan.keys)), [dict(item) for item in expected])
+
+    def test_values_plan_rejects_nested_serializers(self):
+        """Serializers with nested or computed fields use the regular path"""
+        self.assertIsNone(ValuesPlan.compile(BookSerializer()))
+        self.assertIsNone(ValuesPlan.compile(CartItemSerializer()))
+
+    def test_renderer_matches_drf(self):
+        """FastJSONRenderer produces byte-identical JSON"""
+        data = {
+            'price': Decimal('1.10'),
+            'created_at': timezone.now(),
+            'date': date(2020, 5, 17),
+            'text': 'Ñ \u2028 \u2029',
+            'missing': None,
+            1: [True, 2.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_list_endpoint_payload(self):
+        """The books list endpoint returns the same JSON as before"""
+        response = self.client.get('/api/books/')
+        expected = JSONRenderer().render(BookListSerializer(Book.objects.all(), many=True).data)
+        self.assertEqual(response.json()['results'], json.loads(expected))
+
+
+class CompressionTests(TestCase):
+    """Test API response compression"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for n in range(20):
+            Author.objects.create(name=f'Author {n}', bio='A long biography. ' * 20)
+
+    def test_gzip_large_json(self):
+        """Large JSON responses are gzipped for clients that accept it"""
+        response = self.client.get('/api/authors/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data), 20)
+
+    def test_brotli_preferred(self):
+        """Brotli is used when the client accepts it"""
+        response = self.client.get('/api/authors/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(brotli.decompress(response.content))), 20)
+
+    def test_small_responses_not_compressed(self):
+        """Responses under the size threshold are sent as is"""
+        response = self.client.get('/api/editorials/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_csrf_token_responses_not_compressed(self):
+        """Responses carrying a CSRF token are never compressed (BREACH)"""
+        response = self.client.get('/api/csrf-token/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('csrfToken', response.json())
+
+    @override_settings(COMPRESSION_CONTENT_TYPES=['text/html'])
+    def test_content_type_allowlist(self):
+        """Only allowlisted media types are compressed"""
+        response = self.client.get('/api/authors/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class CsrfTokenTests(TestCase):
+    """Test CSRF token delivery to the cross-domain frontend"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient(enforce_csrf_checks=True)
+
+    def test_first_api_response_carries_token(self):
+        """A client without the CSRF cookie gets the token with its first response"""
+        response = self.client.get('/api/books/')
+        token = response['X-CSRFToken']
+        self.assertIn('csrftoken', response.cookies)
+        # Once the cookie is set, ordinary responses don't repeat the token
+        self.assertFalse(self.client.get('/api/books/').has_header('X-CSRFToken'))
+
+        User.objects.create_user(username='buyer', password='testpass123')
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'buyer', 'password': 'testpass123'},
+            HTTP_X_CSRFTOKEN=token
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Login rotates the token and hands out the new one
+        self.assertNotEqual(response['X-CSRFToken'], token)
+
+    def test_csrf_endpoint(self):
+        """The fallback endpoint sets the cookie and returns the token without caching"""
+        response = self.client.get('/api/csrf-token/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['csrfToken'])
+        self.assertIn('csrftoken', response.cookies)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_pages_with_csrf_token_not_compressed(self):
+        """HTML forms embedding the token skip compression (BREACH)"""
+        response = self.client.get('/admin/login/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertGreater(len(response.content), settings.COMPRESSION_MIN_SIZE)
+        self.assertIn(b'csrfmiddlewaretoken', response.content)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class IndexConstraintTests(TestCase):
+    """Test the catalog filters, their indexes and the integrity constraints"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.author = Author.objects.create(name='Author Name')
+        self.editorial = Editorial.objects.create(name='Editorial Name')
+        self.book = Book.objects.create(
+            title='Pride and Prejudice', isbn='9781234567890', price=Decimal('12.50'),
+            author=self.author, editorial=self.editorial, seller=self.user,
+            quantity=3, condition='new', language='en'
+        )
+        Book.objects.create(
+            title='Emma', isbn='9781234567891', price=Decimal('30.00'),
+            author=self.author, editorial=Editorial.objects.create(name='Other Editorial'),
+            seller=self.user, quantity=0, condition='good', language='fr'
+        )
+
+    def list_titles(self, query):
+        response = self.client.get(f'/api/books/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book['title'] for book in response.data['results']]
+
+    def test_filters(self):
+        """Query parameters narrow the book list"""
+        self.assertEqual(self.list_titles('available=true'), ['Pride and Prejudice'])
+        self.assertEqual(self.list_titles('available=false'), ['Emma'])
+        self.assertEqual(self.list_titles('condition=good'), ['Emma'])
+        self.assertEqual(self.list_titles('language=en'), ['Pride and Prejudice'])
+        self.assertEqual(self.list_titles(f'editorial={self.editorial.pk}'), ['Pride and Prejudice'])
+        self.assertEqual(self.list_titles('min_price=20'), ['Emma'])
+        self.assertEqual(self.list_titles('max_price=20&search=pride'), ['Pride and Prejudice'])
+        # Malformed prices and ids are ignored rather than rejected
+        for query in ('min_price=abc', 'min_price=NaN', 'max_price=Infinity', 'author=abc', 'editorial=abc', 'author=1.5'):
+            with self.subTest(query=query):
+                self.assertEqual(len(self.list_titles(query)), 2)
+
+    def test_list_queries_use_indexes(self):
+        """The common catalog queries are planned on the new indexes"""
+        if connection.vendor == 'postgresql':
+            # The test tables are tiny, so make the planner prefer any usable
+            # index over a sequential scan (for this transaction only)
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = 'using {}'
+        elif connection.vendor == 'sqlite':
+            plan = 'USING INDEX {}'
+        else:
+            self.skipTest('Plan assertions are written against SQLite and PostgreSQL output')
+        queries = {
+            'book_recent_idx': Book.objects.order_by('-created_at'),
+            'book_available_recent_idx': Book.objects.filter(is_available=True).order_by('-created_at'),
+            'book_condition_recent_idx': Book.objects.filter(condition='new').order_by('-created_at'),
+            'book_language_recent_idx': Book.objects.filter(language='en').order_by('-created_at'),
+            'book_price_idx': Book.objects.filter(price__gte=5, price__lte=20),
+        }
+        for index, queryset in queries.items():
+            with self.subTest(index=index):
+                self.assertIn(plan.format(index), queryset[:20].explain())
+
+    def test_constraints(self):
+        """Invalid rows are rejected by the database itself"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Book.objects.filter(pk=self.book.pk).update(quantity=-1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Book.objects.filter(pk=self.book.pk).update(price=Decimal('-1.00'))
+
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, book=self.book, quantity=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CartItem.objects.create(cart=cart, book=self.book, quantity=2)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CartItem.objects.filter(cart=cart).update(quantity=0)
+
+    def test_negative_price_and_quantity_rejected(self):
+        """The API validates what the constraints enforce instead of failing on them"""
+        self.client.force_authenticate(user=self.user)
+        data = {
+            'title': 'New Book', 'isbn': '9781234567899', 'price': '10.00', 'quantity': 1,
+            'author_id': self.author.pk, 'editorial_id': self.editorial.pk,
+        }
+        for field, value in (('price', '-1.00'), ('quantity', -1)):
+            with self.subTest(field=field):
+                response = self.client.post('/api/books/', {**data, field: value}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(field, response.data)
+
+                response = self.client.post('/api/books/bulk/', [{**data, field: value}], format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+                response = self.client.patch(
+                    '/api/books/bulk/', [{'id': self.book.pk, field: value}], format='json'
+                )
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 2)
+
+
+class FacetTests(TestCase):
+    """Test the catalog facet counts"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.author = Author.objects.create(name='Author Name')
+        self.editorial = Editorial.objects.create(name='Editorial Name')
+        for i, (condition, price) in enumerate([('new', '5.00'), ('new', '15.00'), ('poor', '150.00')]):
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'978123456789{i}', price=Decimal(price),
+                author=self.author, editorial=self.editorial, seller=self.user,
+                quantity=1, condition=condition
+            )
+
+    def test_facet_counts(self):
+        """Counts per facet come from a single query"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/books/facets/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        conditions = {facet['value']: facet['count'] for facet in data['condition']}
+        self.assertEqual(conditions['new'], 2)
+        self.assertEqual(conditions['poor'], 1)
+        # Conditions without books are still listed
+        self.assertEqual(conditions['fair'], 0)
+        self.assertEqual(data['author'], [{'value': self.author.pk, 'label': 'Author Name', 'count': 3}])
+        self.assertEqual(data['language'], [{'value': 'en', 'count': 3}])
+        self.assertEqual([bucket['count'] for bucket in data['price']], [1, 1, 0, 0, 1])
+        self.assertEqual(data['price'][-1], {'min': '100', 'max': None, 'count': 1})
+
+    def test_facets_follow_filters(self):
+        """Facets describe the filtered book set"""
+        data = self.client.get('/api/books/facets/?condition=new&max_price=10').json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['author'][0]['count'], 1)
+
+    def test_author_facet_is_limited_by_the_database(self):
+        """Only the FACET_LIMIT largest authors are fetched"""
+        other = Author.objects.create(name='Other Author')
+        Book.objects.filter(condition='poor').update(author=other)
+        with patch.object(catalog, 'FACET_LIMIT', 1), CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/books/facets/').json()
+        self.assertEqual(data['author'], [{'value': self.author.pk, 'label': 'Author Name', 'count': 2}])
+        self.assertIn('LIMIT 1', queries[0]['sql'])
+
+    def test_facets_ignore_their_own_filter(self):
+        """A facet is counted without its own filter, so the other choices keep their counts"""
+        data = self.client.get('/api/books/facets/?condition=new&max_price=10').json()
+        conditions = {facet['value']: facet['count'] for facet in data['condition']}
+        # Conditions are filtered by price only, prices by condition only
+        self.assertEqual((conditions['new'], conditions['poor']), (1, 0))
+        self.assertEqual([bucket['count'] for bucket in data['price']], [1, 1, 0, 0, 0])
+
+        data = self.client.get('/api/books/facets/?condition=poor').json()
+        conditions = {facet['value']: facet['count'] for facet in data['condition']}
+        self.assertEqual((data['count'], conditions['new'], conditions['poor']), (1, 2, 1))
+
+    def test_cached_until_catalog_changes(self):
+        """Counts are cached per catalog version and refreshed after a change"""
+        self.client.get('/api/books/facets/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/books/facets/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.filter(condition='poor').get().delete()
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/books/facets/').json()
+        self.assertEqual(data['count'], 2)
+
+
+class BulkBookTests(TestCase):
+    """Test the bulk book endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.authors = [Author.objects.create(name=f'Author {i}') for i in range(3)]
+        self.editorial = Editorial.objects.create(name='Editorial Name')
+        self.client.force_authenticate(user=self.user)
+
+    def book_data(self, count, start=0):
+        return [
+            {
+                'title': f'Book {i}', 'isbn': f'978000000{i:04d}', 'price': '9.99',
+                'author_id': self.authors[i % 3].pk, 'editorial_id': self.editorial.pk,
+                'quantity': i % 2,
+            }
+            for i in range(start, start + count)
+        ]
+
+    def test_bulk_create(self):
+        """Query count doesn't grow with the number of books"""
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post('/api/books/bulk/', self.book_data(2), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post('/api/books/bulk/', self.book_data(50, start=2), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Fewer when the authors and editorial are already cached in memory
+        self.assertLessEqual(len(large), len(small))
+
+        self.assertEqual(Book.objects.filter(seller=self.user).count(), 52)
+        self.assertEqual(response.data[0]['author']['name'], 'Author 2')
+        self.assertFalse(Book.objects.get(isbn='9780000000002').is_available)
+        self.assertEqual(OutboxEvent.objects.count(), 52)
+
+    def test_bulk_create_validation(self):
+        """Invalid items are reported and nothing is written"""
+        data = self.book_data(3)
+        data[1]['author_id'] = 999999
+        data[2]['isbn'] = data[0]['isbn']
+        response = self.client.post('/api/books/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('author_id', response.data[1])
+
+        data[1]['author_id'] = self.authors[0].pk
+        response = self.client.post('/api/books/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('isbn', response.data)
+        self.assertFalse(Book.objects.exists())
+
+    def test_bool_pk_rejected(self):
+        """true isn't taken for pk 1, in bulk or for a single book"""
+        data = self.book_data(2)
+        data[1]['author_id'] = True
+        response = self.client.post('/api/books/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[1]['author_id'][0].code, 'incorrect_type')
+
+        response = self.client.post('/api/books/', data[1], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['author_id'][0].code, 'incorrect_type')
+        self.assertFalse(Book.objects.exists())
+
+    def test_bulk_update(self):
+        """Owners update many books at once"""
+        ids = [book['id'] for book in self.client.post('/api/books/bulk/', self.book_data(3), format='json').data]
+        response = self.client.patch(
+            '/api/books/bulk/', [{'id': pk, 'price': '5.00', 'quantity': 4} for pk in ids], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        books = Book.objects.filter(pk__in=ids)
+        self.assertEqual({book.price for book in books}, {Decimal('5.00')})
+        self.assertTrue(all(book.is_available for book in books))
+
+    def test_bulk_update_isbn_uniqueness(self):
+        """ISBNs are checked as they will be after the update"""
+        ids = [book['id'] for book in self.client.post('/api/books/bulk/', self.book_data(2), format='json').data]
+        taken = Book.objects.get(pk=ids[1]).isbn
+        response = self.client.patch(
+            '/api/books/bulk/', [{'id': ids[0], 'isbn': taken}, {'id': ids[1], 'title': 'Kept'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('isbn', response.data)
+
+        # Still held while the same UPDATE frees it
+        response = self.client.patch(
+            '/api/books/bulk/', [{'id': ids[0], 'isbn': taken}, {'id': ids[1], 'isbn': '9781111111111'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch(
+            '/api/books/bulk/', [{'id': ids[0], 'isbn': '9782222222222'}, {'id': ids[1], 'title': 'Kept'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Book.objects.get(pk=ids[0]).isbn, '9782222222222')
+
+    def test_bulk_requires_ownership(self):
+        """A single foreign book rejects the whole update or delete"""
+        ids = [book['id'] for book in self.client.post('/api/books/bulk/', self.book_data(2), format='json').data]
+        foreign = Book.objects.create(
+            title='Foreign', isbn='9789999999999', price=Decimal('1.00'),
+            author=self.authors[0], editorial=self.editorial, seller=self.other, quantity=1
+        )
+        response = self.client.patch(
+            '/api/books/bulk/', [{'id': pk, 'title': 'Mine now'} for pk in ids + [foreign.pk]], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.delete('/api/books/bulk/', {'ids': ids + [foreign.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Book.objects.count(), 3)
+
+        response = self.client.delete('/api/books/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Book.objects.all()), [foreign])
+
+
+class SellerInventoryTests(TestCase):
+    """Test the seller's own listings and inventory stats"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(username='seller', password='testpass123')
+        self.buyer = User.objects.create_user(username='buyer', password='testpass123')
+        author = Author.objects.create(name='Author Name')
+        editorial = Editorial.objects.create(name='Editorial Name')
+        self.books = [
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'978123456789{i}', price=Decimal('10.00'),
+                author=author, editorial=editorial, seller=self.seller, quantity=i
+            )
+            for i in range(5)
+        ]
+        Book.objects.create(
+            title='Not mine', isbn='9789999999999', price=Decimal('99.00'),
+            author=author, editorial=editorial, seller=self.buyer, quantity=7
+        )
+        cart = Cart.objects.create(user=self.buyer)
+        CartItem.objects.create(cart=cart, book=self.books[4], quantity=3)
+        self.client.force_authenticate(user=self.seller)
+
+    def test_mine_pages_with_cursor(self):
+        """Own listings come newest first, one query per page"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/books/mine/?page_size=3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.data['results']
+        self.assertEqual([book['title'] for book in first], ['Book 4', 'Book 3', 'Book 2'])
+        self.assertEqual(first[0]['in_carts'], 3)
+        self.assertNotIn('count', response.data)
+
+        second = self.client.get(response.data['next']).data
+        self.assertEqual([book['title'] for book in second['results']], ['Book 1', 'Book 0'])
+        self.assertIsNone(second['next'])
+
+    def test_mine_stats(self):
+        """Totals are aggregated over the seller's books and the carts holding them"""
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/books/mine/stats/')
+        self.assertEqual(response.data, {
+            'listings': 5,
+            'units_in_stock': 10,
+            'out_of_stock': 1,
+            'inventory_value': '100.00',
+            'units_in_carts': 3,
+            'carts': 1,
+        })
+
+    def test_requires_authentication(self):
+        """Only signed-in sellers have an inventory"""
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/api/books/mine/').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get('/api/books/mine/stats/').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BookHistoryTests(TestCase):
+    """Test the price and stock history"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        author = Author.objects.create(name='Author Name')
+        editorial = Editorial.objects.create(name='Editorial Name')
+        self.books = [
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'978123456789{i}', price=Decimal('10.00'),
+                author=author, editorial=editorial, seller=self.user, quantity=5
+            )
+            for i in range(2)
+        ]
+        self.book = self.books[0]
+
+    def test_changes_are_recorded(self):
+        """Creating a book and changing its price or stock appends history"""
+        self.book.price = Decimal('12.00')
+        self.book.save()
+        self.book.title = 'Renamed'
+        self.book.save()
+        rows = list(self.book.history.values_list('price', 'quantity', 'quantity_change'))
+        self.assertEqual(rows, [(Decimal('10.00'), 5, 5), (Decimal('12.00'), 5, 0)])
+
+    def test_checkout_records_history_in_bulk(self):
+        """Checkout writes the history of all purchased books with one insert"""
+        self.client.force_authenticate(user=self.user)
+        for book in self.books:
+            self.client.post('/api/cart/add_item/', {'book_id': book.pk, 'quantity': 2})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/cart/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "books_bookhistory"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            list(BookHistory.objects.filter(quantity_change=-2).order_by('book_id').values_list('book_id', 'quantity')),
+            [(self.books[0].pk, 3), (self.books[1].pk, 3)]
+        )
+
+    def test_rollup(self):
+        """Old changes are folded into one row per book and day"""
+        day = timezone.localdate() - timedelta(days=40)
+        start = timezone.make_aware(datetime.combine(day, time(9)))
+        BookHistory.objects.filter(book=self.book).update(recorded_at=start)
+        for hours, price, quantity, change in [(1, '8.00', 3, -2), (2, '11.00', 9, 6)]:
+            BookHistory.objects.create(
+                book=self.book, recorded_at=start + timedelta(hours=hours),
+                price=Decimal(price), quantity=quantity, quantity_change=change
+            )
+
+        out = StringIO()
+        call_command('rollup_book_history', '--days=30', stdout=out)
+        self.assertIn('Rolled up 3 history rows', out.getvalue())
+        self.assertFalse(BookHistory.objects.filter(book=self.book).exists())
+        daily = BookDailyHistory.objects.get(book=self.book)
+        self.assertEqual(daily.day, day)
+        self.assertEqual(
+            (daily.open_price, daily.close_price, daily.min_price, daily.max_price),
+            (Decimal('10.00'), Decimal('11.00'), Decimal('8.00'), Decimal('11.00'))
+        )
+        self.assertEqual((daily.close_quantity, daily.units_sold, daily.units_added), (9, 2, 11))
+        # Recent history is left alone
+        self.assertTrue(BookHistory.objects.filter(book=self.books[1]).exists())
+
+    def test_rollup_in_batches(self):
+        """Every book is rolled up whatever the batch size, and only once"""
+        day = timezone.localdate() - timedelta(days=40)
+        BookHistory.objects.update(recorded_at=timezone.make_aware(datetime.combine(day, time(9))))
+        cutoff = history.rollup_cutoff(30)
+        self.assertEqual(history.rollup(cutoff, batch_size=1), 2)
+        self.assertEqual(
+            list(BookDailyHistory.objects.order_by('book_id').values_list('book_id', 'day', 'units_added')),
+            [(self.books[0].pk, day, 5), (self.books[1].pk, day, 5)]
+        )
+        self.assertEqual(history.rollup(cutoff, batch_size=1), 0)
+
+    def test_series_endpoint(self):
+        """The series combines rolled-up days and recent changes"""
+        BookDailyHistory.objects.create(
+            book=self.book, day=date(2024, 1, 1), open_price=Decimal('9.00'), close_price=Decimal('9.50'),
+            min_price=Decimal('9.00'), max_price=Decimal('9.50'), close_quantity=4, units_sold=1
+        )
+        response = self.client.get(f'/api/books/{self.book.pk}/history/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['daily'][0]['close_price'], '9.50')
+        self.assertEqual(response.data['points'][0]['quantity'], 5)
+
+        response = self.client.get(f'/api/books/{self.book.pk}/history/?until=2024-06-30')
+        self.assertEqual(len(response.data['daily']), 1)
+        self.assertEqual(response.data['points'], [])
+        response = self.client.get(f'/api/books/{self.book.pk}/history/?since=yesterday')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CartCleanupTests(TestCase):
+    """Test the cart maintenance jobs"""
+
+    def setUp(self):
+        author = Author.objects.create(name='Author Name')
+        editorial = Editorial.objects.create(name='Editorial Name')
+        seller = User.objects.create_user(username='seller', password='testpass123')
+        self.in_stock = Book.objects.create(
+            title='In stock', isbn='9781234567890', price=Decimal('10.00'),
+            author=author, editorial=editorial, seller=seller, quantity=5
+        )
+        self.sold_out = Book.objects.create(
+            title='Sold out', isbn='9781234567891', price=Decimal('10.00'),
+            author=author, editorial=editorial, seller=seller, quantity=1
+        )
+        self.carts = [
+            Cart.objects.create(user=User.objects.create_user(username=f'user{i}', password='testpass123'))
+            for i in range(5)
+        ]
+
+    def age(self, queryset, days):
+        queryset.update(updated_at=timezone.now() - timedelta(days=days))
+
+    def test_cleanup(self):
+        """Each job removes only what it targets"""
+        # carts[0]: idle for long with an item; carts[1]: active with an old cart row
+        old_item = CartItem.objects.create(cart=self.carts[0], book=self.in_stock, quantity=1)
+        CartItem.objects.create(cart=self.carts[1], book=self.in_stock, quantity=1)
+        self.age(CartItem.objects.filter(pk=old_item.pk), 60)
+        # carts[2]: holds a book that has since sold out
+        CartItem.objects.create(cart=self.carts[2], book=self.sold_out, quantity=1)
+        StockReservation.objects.create(
+            cart=self.carts[2], book=self.sold_out, quantity=1,
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        self.sold_out.quantity = 0
+        self.sold_out.save()
+        self.age(Cart.objects.all(), 60)
+        # carts[3] is empty and idle too; carts[4] is empty but was just used
+        self.age(Cart.objects.filter(pk=self.carts[4].pk), 0)
+
+        out = StringIO()
+        call_command('cleanup_carts', '--batch-size=2', stdout=out)
+        self.assertIn('Deleted 2 idle carts, 1 items for unavailable books and 1 empty carts', out.getvalue())
+        # carts[2] was emptied by dropping the sold-out item, then purged
+        self.assertEqual(list(Cart.objects.order_by('pk')), [self.carts[1], self.carts[4]])
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_prunes_processed_outbox_events(self):
+        """Old processed events go; pending, failed and recent ones stay"""
+        OutboxEvent.objects.all().delete()
+        old = timezone.now() - timedelta(days=8)
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(topic='test', processed_at=old),
+            OutboxEvent(topic='test', processed_at=timezone.now()),
+            OutboxEvent(topic='test'),
+            OutboxEvent(topic='test', attempts=5, next_attempt_at=old),
+        ])
+        self.assertEqual(cleanup.prune_outbox(), 1)
+        self.assertEqual(OutboxEvent.objects.count(), 3)
+
+    def test_deletes_in_primary_key_windows(self):
+        """Every DELETE is bounded to a primary key range of batch_size ids"""
+        self.age(Cart.objects.all(), 2)
+        with CaptureQueriesContext(connection) as queries:
+            deleted = cleanup.purge_empty_carts(timedelta(days=1), batch_size=2)
+        self.assertEqual(deleted, 5)
+        deletes = [q['sql'] for q in queries if q['sql'].startswith('DELETE FROM "books_cart"')]
+        self.assertEqual(len(deletes), 3)
+        self.assertFalse(Cart.objects.exists())
+
+
+class TrendingTests(TestCase):
+    """Test the trending books ranking"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        author = Author.objects.create(name='Author Name')
+        editorial = Editorial.objects.create(name='Editorial Name')
+        self.books = [
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'978123456789{i}', price=Decimal('10.00'),
+                author=author, editorial=editorial, seller=self.user, quantity=10
+            )
+            for i in range(3)
+        ]
+
+    def test_activity_is_counted(self):
+        """Cart adds and purchases feed the hourly counters"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 2})
+        self.client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1})
+        self.client.post('/api/cart/checkout/')
+        activity = BookActivity.objects.get(book=self.books[0])
+        self.assertEqual((activity.adds, activity.purchases), (2, 3))
+        self.assertEqual(activity.hour, trending.current_hour())
+
+    def test_ranking_decays_with_age(self):
+        """Recent activity outranks older activity of the same size; expired activity is dropped"""
+        now = timezone.now()
+        hour = trending.current_hour(now)
+        BookActivity.objects.create(book=self.books[0], hour=hour - timedelta(days=2), purchases=5)
+        BookActivity.objects.create(book=self.books[1], hour=hour, purchases=4)
+        BookActivity.objects.create(book=self.books[2], hour=hour - timedelta(days=30), purchases=100)
+
+        out = StringIO()
+        call_command('compute_trending', stdout=out)
+        self.assertIn('Ranked 2 trending books', out.getvalue())
+        self.assertEqual(
+            list(TrendingBook.objects.values_list('book_id', flat=True)),
+            [self.books[1].pk, self.books[0].pk]
+        )
+        self.assertFalse(BookActivity.objects.filter(book=self.books[2]).exists())
+
+    def test_endpoint_reads_from_cache(self):
+        """The endpoint serves the precomputed ranking without queries once cached"""
+        BookActivity.objects.create(book=self.books[2], hour=trending.current_hour(), adds=1)
+        trending.compute()
+        response = self.client.get('/api/books/trending/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([book['title'] for book in response.data], ['Book 2'])
+        with self.assertNumQueries(0):
+            self.client.get('/api/books/trending/')
+
+    def test_book_changes_drop_cached_ranking(self):
+        """A ranked book that is repriced, sold out or deleted isn't served stale"""
+        for book in self.books:
+            BookActivity.objects.create(book=book, hour=trending.current_hour(), adds=1)
+        trending.compute()
+        self.assertEqual(len(self.client.get('/api/books/trending/').data), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[0].price = Decimal('12.00')
+            self.books[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[1].quantity = 0
+            self.books[1].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[2].delete()
+        response = self.client.get('/api/books/trending/')
+        self.assertEqual([(book['title'], book['price']) for book in response.data], [('Book 0', '12.00')])
+
+
+class CartMutationResponseTests(TestCase):
+    """Test cart mutations returning the updated cart"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        author = Author.objects.create(name='Author Name')
+        editorial = Editorial.objects.create(name='Editorial Name')
+        self.books = [
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'978123456789{i}', price=Decimal('10.50'),
+                author=author, editorial=editorial, seller=self.user, quantity=10
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def test_add_item_returns_cart(self):
+        """The response carries every item and the recomputed total"""
+        self.client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1})
+        response = self.client.post('/api/cart/add_item/?return=cart', {'book_id': self.books[1].pk, 'quantity': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual(response.data['total'], Decimal('31.50'))
+        self.assertEqual(response.data, self.client.get('/api/cart/').data)
+
+    def test_query_count_independent_of_cart_size(self):
+        """Rendering the cart doesn't issue a query per item"""
+        self.client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1})
+        with CaptureQueriesContext(connection) as small:
+            self.client.put('/api/cart/update_item/?return=cart', {'book_id': self.books[0].pk, 'quantity': 2})
+        for book in self.books[1:]:
+            self.client.post('/api/cart/add_item/', {'book_id': book.pk, 'quantity': 1})
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.put('/api/cart/update_item/?return=cart', {'book_id': self.books[0].pk, 'quantity': 3})
+        self.assertEqual(len(response.data['items']), 3)
+        self.assertEqual(len(large), len(small))
+
+    def test_remove_and_clear_return_cart(self):
+        """Removals return the remaining cart instead of an empty 204"""
+        for book in self.books[:2]:
+            self.client.post('/api/cart/add_item/', {'book_id': book.pk, 'quantity': 1})
+        response = self.client.delete(f'/api/cart/remove_item/?book_id={self.books[0].pk}&return=cart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['book']['id'] for item in response.data['items']], [self.books[1].pk])
+        self.assertEqual(response.data['total'], Decimal('10.50'))
+
+        response = self.client.post('/api/cart/clear/?return=cart')
+        self.assertEqual(response.data['items'], [])
+        self.assertEqual(response.data['total'], Decimal('0'))
+
+
+class CoverTests(TestCase):
+    """Test the cover ingest and serving"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.addCleanup(shutil.rmtree, self.source)
+        settings_override = override_settings(COVER_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.book = Book.objects.create(
+            title='Book', isbn='9781234567890', price=Decimal('10.00'),
+            author=Author.objects.create(name='Author Name'),
+            editorial=Editorial.objects.create(name='Editorial Name'),
+            seller=self.user, quantity=1
+        )
+        Image.new('RGB', (1200, 1800), 'navy').save(os.path.join(self.source, '978-1-234567-89-0.png'))
+        Image.new('RGB', (10, 10)).save(os.path.join(self.source, '9780000000002.jpg'))
+        open(os.path.join(self.source, 'notes.txt'), 'w').close()
+
+    def ingest(self):
+        out = StringIO()
+        call_command('ingest_covers', self.source, '--workers=1', stdout=out)
+        return out.getvalue()
+
+    def test_ingest_renders_variants(self):
+        """Every size and format is written under the content hash"""
+        output = self.ingest()
+        self.assertIn('Updated the cover of 1 books', output)
+        self.assertIn('9780000000002', output)
+        self.book.refresh_from_db()
+        digest = self.book.cover_hash
+        self.assertEqual(len(digest), 16)
+        files = sorted(os.listdir(os.path.join(self.root, digest[:2])))
+        self.assertEqual(len(files), 6)
+        with Image.open(os.path.join(self.root, digest[:2], f'{digest}-M.webp')) as image:
+            self.assertEqual(image.size, (240, 360))
+
+        self.assertIn('Updated the cover of 0 books', self.ingest())
+
+    def test_unreadable_images_are_skipped(self):
+        """A corrupt image is reported without stopping the other covers"""
+        broken = Book.objects.create(
+            title='Broken', isbn='9781234567891', price=Decimal('10.00'),
+            author=self.book.author, editorial=self.book.editorial, seller=self.user, quantity=1
+        )
+        with open(os.path.join(self.source, '9781234567891.jpg'), 'wb') as f:
+            f.write(b'not an image')
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                updated, _, unreadable = covers.ingest(self.source, workers=workers)
+                self.assertEqual(unreadable, ['9781234567891'])
+        self.assertEqual(updated, 0)
+        self.book.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual(len(self.book.cover_hash), 16)
+        self.assertFalse(broken.cover_hash)
+        self.assertIn('Skipped 1 unreadable images: 9781234567891', self.ingest())
+
+    def test_cover_is_served_with_immutable_headers(self):
+        """Covers are cacheable forever and revalidate with their ETag"""
+        self.ingest()
+        self.book.refresh_from_db()
+        url = f'/covers/{self.book.cover_hash[:2]}/{self.book.cover_hash}-S.webp'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        b''.join(response.streaming_content)
+        response.close()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unknown_paths_are_not_found(self):
+        """Only rendered variant names are served"""
+        for path in ['../settings.py', 'ab/abababababababab-M.webp', 'ab/notes.txt']:
+            self.assertEqual(self.client.get(f'/covers/{path}').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ImportTests(TestCase):
+    """Test the book import pipeline"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.author = Author.objects.create(name='Jane Austen')
+
+    def row(self, **values):
+        row = {
+            'title': 'Emma', 'isbn': '978-0-14-143958-7', 'author': 'Jane Austen',
+            'editorial': 'Penguin', 'seller': 'seller', 'price': '12.50', 'quantity': '2',
+        }
+        row.update(values)
+        return row
+
+    def test_rows_are_validated_and_written_in_order(self):
+        """Valid rows become books; invalid and duplicate rows are reported"""
+        rows = [
+            self.row(),
+            self.row(isbn='9780141439600', price='abc', condition='mint'),
+            self.row(title='Emma again'),
+            self.row(isbn='9780141439662', title='Persuasion', author='New Author', quantity='0'),
+            self.row(isbn='9780141439686', seller='nobody'),
+        ]
+        report = importer.import_rows(rows, workers=1, batch_size=2)
+        self.assertEqual((report['created'], report['duplicates'], report['invalid']), (2, 1, 2))
+        self.assertEqual([number for number, _ in report['errors']], [2, 5])
+        self.assertIn('condition', report['errors'][0][1])
+
+        emma = Book.objects.get(isbn='9780141439587')
+        self.assertEqual((emma.author, emma.price, emma.seller), (self.author, Decimal('12.50'), self.user))
+        self.assertFalse(Book.objects.get(title='Persuasion').is_available)
+        self.assertTrue(Author.objects.filter(name='New Author').exists())
+        self.assertEqual(BookHistory.objects.count(), 2)
+
+    def test_command_reads_csv(self):
+        """import_books skips rows already in the catalog on a second run"""
+        path = os.path.join(tempfile.mkdtemp(), 'feed.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w', newline='') as f:
+            f.write('title,isbn,author,editorial,seller,price,pages\n')
+            f.write('Emma,9780141439587,Jane Austen,Penguin,seller,12.50,512\n')
+
+        out = StringIO()
+        call_command('import_books', path, '--workers=1', stdout=out)
+        self.assertIn('Imported 1 books', out.getvalue())
+        self.assertEqual(Book.objects.get().pages, 512)
+        call_command('import_books', path, '--workers=1', stdout=out)
+        self.assertIn('Imported 0 books (1 duplicates skipped', out.getvalue())
+
+    def test_populate_db_uses_pipeline(self):
+        """The seed command creates its books through the pipeline"""
+        call_command('populate_db', stdout=StringIO())
+        count = Book.objects.count()
+        self.assertGreater(count, 50)
+        self.assertEqual(Book.objects.values('isbn').distinct().count(), count)
+
+
+class BootstrapTests(TestCase):
+    """Test the deploy bootstrap command"""
+
+    def test_seeds_empty_catalog_once(self):
+        """An empty catalog is populated; a populated one is left alone"""
+        out = StringIO()
+        call_command('bootstrap', stdout=out)
+        self.assertIn('No migrations to apply', out.getvalue())
+        self.assertIn('Populating the empty catalog', out.getvalue())
+        count = Book.objects.count()
+        self.assertGreater(count, 0)
+
+        out = StringIO()
+        call_command('bootstrap', stdout=out)
+        self.assertNotIn('Populating', out.getvalue())
+        self.assertEqual(Book.objects.count(), count)
+
+    def test_no_seed(self):
+        """--no-seed leaves the catalog empty"""
+        call_command('bootstrap', '--no-seed', stdout=StringIO())
+        self.assertFalse(Book.objects.exists())
+
+    def test_per_process_cache_not_warmed(self):
+        """A locmem cache would die with the command, so only the URLconf is warmed"""
+        out = StringIO()
+        with patch('books.management.commands.bootstrap.trending_books') as trending:
+            call_command('bootstrap', '--no-seed', stdout=out)
+        trending.assert_not_called()
+        self.assertIn('Warmed up the URLconf\n', out.getvalue())
+
+
+class ReferenceCacheTests(TestCase):
+    """Test the in-process cache of authors and editorials"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='seller', password='testpass123')
+        self.author = Author.objects.create(name='Jane Austen')
+        self.editorial = Editorial.objects.create(name='Penguin')
+
+    def test_list_served_from_memory(self):
+        """Lists are rendered once, then served without queries until the table changes"""
+        self.assertEqual(len(self.client.get('/api/authors/').data), 1)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/authors/')
+        self.assertEqual(response.data[0]['name'], 'Jane Austen')
+        self.assertEqual(self.client.get('/api/authors/?fields=id').data, [{'id': self.author.pk}])
+
+        Author.objects.create(name='Leo Tolstoy')
+        self.assertEqual(len(self.client.get('/api/authors/').data), 2)
+
+    def test_other_process_change_is_noticed(self):
+        """A version bump from another process drops the local entries"""
+        self.client.get('/api/editorials/')
+        Editorial.objects.filter(pk=self.editorial.pk).update(name='Vintage')
+        self.assertEqual(self.client.get('/api/editorials/').data[0]['name'], 'Penguin')
+        reference.editorials.bump()
+        self.assertEqual(self.client.get('/api/editorials/').data[0]['name'], 'Vintage')
+
+    def test_foreign_keys_validated_from_memory(self):
+        """Book validation resolves authors and editorials without queries once cached"""
+        serializer = BookSerializer(data={
+            'title': 'Emma', 'isbn': '9780141439587', 'price': '9.99',
+            'author_id': self.author.pk, 'editorial_id': self.editorial.pk,
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(reference.authors.get(self.author.pk), self.author)
+        with self.assertNumQueries(0):
+            self.assertEqual(reference.authors.get(self.author.pk).name, 'Jane Austen')
+
+        serializer = BookSerializer(data={
+            'title': 'Emma', 'isbn': '9780141439588', 'price': '9.99',
+            'author_id': 999999, 'editorial_id': self.editorial.pk,
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('author_id', serializer.errors)
+
+
+class IdempotencyTests(TestCase):
+    """Test Idempotency-Key support on cart mutations"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        self.book = Book.objects.create(
+            title='Book', isbn='9781234567890', price=Decimal('10.50'),
+            author=Author.objects.create(name='Author Name'),
+            editorial=Editorial.objects.create(name='Editorial Name'),
+            seller=self.user, quantity=5
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def add(self, key, quantity=1):
+        return self.client.post(
+            '/api/cart/add_item/?return=cart', {'book_id': self.book.pk, 'quantity': quantity},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_stored_response(self):
+        """A retried add returns the first response from one lookup without adding again"""
+        first = self.add('add-1', quantity=2)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(1):
+            retry = self.add('add-1', quantity=2)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(CartItem.objects.get().quantity, 2)
+
+        self.assertEqual(self.add('add-2').status_code, status.HTTP_200_OK)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
+
+    def test_checkout_runs_once(self):
+        """A retried checkout doesn't take the stock twice"""
+        self.add('add-1', quantity=2)
+        responses = [
+            self.client.post('/api/cart/checkout/', HTTP_IDEMPOTENCY_KEY='checkout-1') for _ in range(2)
+        ]
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.quantity, 3)
+
+    def test_key_reused_for_other_request(self):
+        """A key sent with a different payload is rejected"""
+        self.add('add-1')
+        response = self.add('add-1', quantity=3)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+
+    def test_error_responses_and_expiry(self):
+        """Client errors are replayed; expired keys run again and are swept"""
+        response = self.client.post(
+            '/api/cart/add_item/', {'book_id': self.book.pk, 'quantity': 9}, format='json', HTTP_IDEMPOTENCY_KEY='big'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 400)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(self.add('add-1').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(cleanup.expire_idempotency_keys(), 1)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['add-1'])
+
+
+class CheckoutResultTests(TestCase):
+    """Test the per-line checkout result"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        author = Author.objects.create(name='Author Name')
+        editorial = Editorial.objects.create(name='Editorial Name')
+        self.books = [
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'978123456789{i}', price=Decimal('10.00'),
+                author=author, editorial=editorial, seller=self.other, quantity=3
+            )
+            for i in range(2)
+        ]
+        self.client.force_authenticate(user=self.user)
+        for book in self.books:
+            self.client.post('/api/cart/add_item/', {'book_id': book.pk, 'quantity': 2})
+
+    def test_failure_reports_every_line_from_one_query(self):
+        """Stock shortages and price changes of all lines come back together"""
+        other = APIClient()
+        other.force_authenticate(user=self.other)
+        other.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1})
+        Book.objects.filter(pk=self.books[0].pk).update(quantity=2)
+        Book.objects.filter(pk=self.books[1].pk).update(price=Decimal('12.00'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/cart/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        lines = {line['book_id']: line for line in response.data['lines']}
+        self.assertEqual(
+            (lines[self.books[0].pk]['requested'], lines[self.books[0].pk]['available'], lines[self.books[0].pk]['ok']),
+            (2, 1, False)
+        )
+        self.assertTrue(lines[self.books[1].pk]['ok'])
+        self.assertTrue(lines[self.books[1].pk]['price_changed'])
+        self.assertEqual(lines[self.books[1].pk]['added_price'], '10.00')
+        self.assertEqual(len(response.data['errors']), 1)
+        item_queries = [q for q in queries if 'books_cartitem' in q['sql'] and q['sql'].startswith('SELECT')]
+        self.assertEqual(len(item_queries), 1)
+
+    def test_success_flags_price_changes(self):
+        """Checkout goes through at the current price and says which prices changed"""
+        Book.objects.filter(pk=self.books[1].pk).update(price=Decimal('12.00'))
+        response = self.client.post('/api/cart/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], '44.00')
+        self.assertEqual(
+            [item['price_changed'] for item in response.data['purchased_items']].count(True), 1
+        )
+        self.assertFalse(CartItem.objects.exists())
+
+
+class GuestCartTests(TestCase):
+    """Test the session-kept guest cart and its merge on login"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        author = Author.objects.create(name='Author Name')
+        editorial = Editorial.objects.create(name='Editorial Name')
+        self.books = [
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'978123456789{i}', price=Decimal('10.00'),
+                author=author, editorial=editorial, seller=self.other, quantity=3
+            )
+            for i in range(3)
+        ]
+
+    def login(self):
+        return self.client.post('/api/auth/login/', {'username': 'buyer', 'password': 'testpass123'})
+
+    def test_guest_cart_is_kept_in_the_session(self):
+        """Guests add, update and remove lines without a Cart row or reservations"""
+        response = self.client.post('/api/cart/add_item/?return=cart', {'book_id': self.books[0].pk, 'quantity': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total'], Decimal('20.00'))
+        self.client.post('/api/cart/add_item/', {'book_id': self.books[1].pk, 'quantity': 1})
+        self.client.patch('/api/cart/update_item/', {'book_id': self.books[1].pk, 'quantity': 3}, format='json')
+        self.client.delete(f'/api/cart/remove_item/?book_id={self.books[0].pk}')
+
+        response = self.client.get('/api/cart/')
+        self.assertEqual(
+            [(item['book']['id'], item['quantity']) for item in response.data['items']],
+            [(self.books[1].pk, 3)]
+        )
+        self.assertEqual(self.client.session['cart'], {str(self.books[1].pk): 3})
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+        response = self.client.post('/api/cart/add_item/', {'book_id': self.books[1].pk, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_guest_writes_require_csrf_token(self):
+        """A cross-site request can't plant books in a guest cart"""
+        client = APIClient(enforce_csrf_checks=True)
+        response = client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1})
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertNotIn('cart', client.session)
+
+        self.assertEqual(client.get('/api/cart/').status_code, status.HTTP_200_OK)
+        token = client.get('/api/csrf-token/').json()['csrfToken']
+        response = client.post(
+            '/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1}, HTTP_X_CSRFTOKEN=token
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_login_merges_the_guest_cart_within_stock(self):
+        """Quantities add up with the user's cart, capped at the copies other carts leave"""
+        self.client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 2})
+        self.client.post('/api/cart/add_item/', {'book_id': self.books[1].pk, 'quantity': 2})
+        user_client = APIClient()
+        user_client.force_authenticate(user=self.user)
+        user_client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1})
+        other_client = APIClient()
+        other_client.force_authenticate(user=self.other)
+        other_client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1})
+
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cart_adjusted'], [{'book_id': self.books[0].pk, 'quantity': 2}])
+
+        items = dict(CartItem.objects.filter(cart__user=self.user).values_list('book_id', 'quantity'))
+        self.assertEqual(items, {self.books[0].pk: 2, self.books[1].pk: 2})
+        held = dict(StockReservation.objects.filter(cart__user=self.user).values_list('book_id', 'quantity'))
+        self.assertEqual(held, items)
+        self.assertNotIn('cart', self.client.session)
+        self.assertEqual(len(self.client.get('/api/cart/').data['items']), 2)
+
+    def test_merge_queries_do_not_grow_with_the_cart(self):
+        """The merge reads and writes all lines in bulk"""
+        for book in self.books:
+            self.client.post('/api/cart/add_item/', {'book_id': book.pk, 'quantity': 1})
+        session = self.client.session
+        with CaptureQueriesContext(connection) as queries:
+            guest_cart.merge(session, self.user)
+        few = len(queries)
+
+        self.client = APIClient()
+        self.client.post('/api/cart/add_item/', {'book_id': self.books[0].pk, 'quantity': 1})
+        session = self.client.session
+        with CaptureQueriesContext(connection) as queries:
+            guest_cart.merge(session, self.other)
+        self.assertEqual(len(queries), few)
+
+
+class RelatedBooksTests(TestCase):
+    """Test the books of an author and of an editorial"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        seller = User.objects.create_user(username='seller', password='testpass123')
+        self.author = Author.objects.create(name='Author Name')
+        self.editorial = Editorial.objects.create(name='Editorial Name')
+        other_author = Author.objects.create(name='Other Author')
+        other_editorial = Editorial.objects.create(name='Other Editorial')
+        for i in range(5):
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'978123456789{i}', price=Decimal('10.00'),
+                author=self.author if i % 2 == 0 else other_author,
+                editorial=self.editorial if i < 3 else other_editorial,
+                seller=seller, quantity=1
+            )
+
+    def test_author_books_page_with_cursor(self):
+        """An author's books come newest first, one query per page once the author is cached"""
+        response = self.client.get(f'/api/authors/{self.author.pk}/books/?page_size=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([book['title'] for book in response.data['results']], ['Book 4', 'Book 2'])
+        self.assertEqual(response.data['results'][0]['author_name'], 'Author Name')
+
+        with self.assertNumQueries(1):
+            second = self.client.get(response.data['next']).data
+        self.assertEqual([book['title'] for book in second['results']], ['Book 0'])
+        self.assertIsNone(second['next'])
+
+    def test_editorial_books(self):
+        response = self.client.get(f'/api/editorials/{self.editorial.pk}/books/?fields=title')
+        self.assertEqual(response.data['results'], [{'title': 'Book 2'}, {'title': 'Book 1'}, {'title': 'Book 0'}])
+
+    def test_unknown_author(self):
+        response = self.client.get('/api/authors/999/books/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/api/authors/abc/books/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # Past the bigint range, which PostgreSQL would reject with an error
+        response = self.client.get('/api/authors/99999999999999999999/books/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
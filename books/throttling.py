@@ -0,0 +1,136 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Sliding-window counter throttle backed by the Django cache.
+
+    DRF's default throttles keep a list of request timestamps per client,
+    which is rewritten on every request and races between workers. Here each
+    client only has two integer counters (the current and previous fixed
+    window); the previous window is weighted by how much of it still overlaps
+    the sliding window. Counters are bumped with the cache's atomic `incr`,
+    so the limit holds across workers sharing the same cache.
+    """
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+
+        counts = self.cache.get_many([current_key, previous_key])
+        self.current = counts.get(current_key, 0)
+        self.previous = counts.get(previous_key, 0)
+        self.elapsed = self.now - window * self.duration
+
+        if self.estimated_count() >= self.num_requests:
+            return self.throttle_failure()
+
+        # Keep counters for two windows so the next window can still weigh them
+        if not self.cache.add(current_key, 1, self.duration * 2):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                # The key expired between add() and incr()
+                self.cache.set(current_key, 1, self.duration * 2)
+        return True
+
+    def estimated_count(self):
+        """Requests in the sliding window ending now"""
+        overlap = (self.duration - self.elapsed) / self.duration
+        return self.previous * overlap + self.current
+
+    def wait(self):
+        """
+        Seconds until the estimated count drops below the limit, assuming
+        no further requests are accepted in the meantime.
+        """
+        remaining = self.duration - self.elapsed
+        excess = self.estimated_count() - self.num_requests + 1
+
+        if self.previous and excess <= self.previous * remaining / self.duration:
+            # The previous window decays enough before this one ends
+            return max(excess * self.duration / self.previous, 1)
+
+        # Otherwise wait for this window to roll over and decay in turn
+        excess = self.current - self.num_requests + 1
+        return remaining + max(excess * self.duration / self.current, 1)
+
+
+class AnonCatalogThrottle(SlidingWindowRateThrottle):
+    """Limit anonymous reads of the catalog (books, authors, editorials)"""
+    scope = 'anon_catalog'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class LoginIPThrottle(SlidingWindowRateThrottle):
+    """Limit login attempts coming from a single client address"""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class LoginUsernameThrottle(SlidingWindowRateThrottle):
+    """Limit login attempts against a single username, whatever the address"""
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username')
+        if not username:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': str(username).strip().lower(),
+        }
+
+
+class CartMutationThrottle(SlidingWindowRateThrottle):
+    """Limit writes to a user's cart, or to a client address's guest carts"""
+    scope = 'cart'
+
+    def get_cache_key(self, request, view):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = f'guest:{self.get_ident(request)}'
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': ident,
+        }
+
+
+class CheckoutThrottle(SlidingWindowRateThrottle):
+    """Limit checkout attempts per user"""
+    scope = 'checkout'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': request.user.pk,
+        }
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import tempfile
+
+from PIL import Image
+
+# Cover thumbnail rendering. This module only depends on Pillow, not on Django,
+# so it runs in ProcessPoolExecutor workers without setting Django up.
+
+# Bounding boxes of the cover sizes, largest first: each size is resized from
+# the previous one instead of from the full-size source
+SIZES = {
+    'L': (480, 720),
+    'M': (240, 360),
+    'S': (96, 144),
+}
+
+FORMATS = {
+    'jpg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def variant_name(digest, size, ext):
+    """Path of a variant relative to the cover root, e.g. 'ab/abcd...-M.webp'"""
+    return f'{digest[:2]}/{digest}-{size}.{ext}'
+
+
+def render_cover(source, root):
+    """
+    Write every size and format of the image at `source` under `root`,
+    named after the hash of its content. Existing variants are kept, so
+    re-ingesting an unchanged image only costs the hash. Returns the hash,
+    or None if the image can't be read or decoded.
+    """
+    try:
+        with open(source, 'rb') as f:
+            data = f.read()
+        digest = content_hash(data)
+        names = [variant_name(digest, size, ext) for size in SIZES for ext in FORMATS]
+        if all(os.path.exists(os.path.join(root, name)) for name in names):
+            return digest
+
+        with Image.open(source) as image:
+            # Let the JPEG decoder downscale while decoding large sources
+            image.draft('RGB', SIZES['L'])
+            image = image.convert('RGB')
+            for size, box in SIZES.items():
+                image.thumbnail(box, Image.Resampling.LANCZOS)
+                for ext, options in FORMATS.items():
+                    save_atomic(image, os.path.join(root, variant_name(digest, size, ext)), options)
+    except (OSError, Image.DecompressionBombError):
+        # UnidentifiedImageError and truncated or corrupt data are OSErrors
+        return None
+    return digest
+
+
+def save_atomic(image, path, options):
+    """Write through a temporary file so readers never see a partial image"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, **options)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
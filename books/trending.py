@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .catalog import catalog_version
+from .cleanup import delete_in_batches
+from .models import BookActivity, TrendingBook
+from .serializers import BookListSerializer
+
+TRENDING_CACHE_KEY = 'trending_books'
+
+ADD_WEIGHT = 1
+PURCHASE_WEIGHT = 3
+
+
+def cache_key():
+    """Keyed by the catalog version, so any book change drops the rendered ranking"""
+    return f'{TRENDING_CACHE_KEY}:{catalog_version()}'
+
+
+def current_hour(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def record_activity(kind, counts):
+    """
+    Add `counts` ({book_id: n}) to the current hour's `kind` counter
+    ('adds' or 'purchases'). Runs inside the caller's transaction.
+    """
+    hour = current_hour()
+    for book_id, count in counts.items():
+        updated = BookActivity.objects.filter(book_id=book_id, hour=hour).update(**{kind: F(kind) + count})
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                BookActivity.objects.create(book_id=book_id, hour=hour, **{kind: count})
+        except IntegrityError:
+            # Another request created this hour's row first
+            BookActivity.objects.filter(book_id=book_id, hour=hour).update(**{kind: F(kind) + count})
+
+
+def compute(now=None):
+    """
+    Rebuild the trending ranking from the activity of the last
+    TRENDING_WINDOW_DAYS. Each hour's adds and purchases count less the older
+    they are, halving every TRENDING_HALF_LIFE_HOURS. Activity that fell out
+    of the window is deleted. Returns the number of books ranked.
+    """
+    now = now or timezone.now()
+    window_start = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+    scores = {}
+    rows = (
+        BookActivity.objects.filter(hour__gte=window_start)
+        .values_list('book_id', 'hour', 'adds', 'purchases')
+    )
+    for book_id, hour, adds, purchases in rows.iterator():
+        decay = 0.5 ** (max((now - hour).total_seconds(), 0) / half_life)
+        scores[book_id] = scores.get(book_id, 0) + (adds * ADD_WEIGHT + purchases * PURCHASE_WEIGHT) * decay
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:settings.TRENDING_SIZE]
+    with transaction.atomic():
+        TrendingBook.objects.all().delete()
+        TrendingBook.objects.bulk_create([
+            TrendingBook(rank=rank, book_id=book_id, score=score, computed_at=now)
+            for rank, (book_id, score) in enumerate(ranked, start=1)
+        ])
+    cache.delete(cache_key())
+
+    delete_in_batches(BookActivity.objects.filter(hour__lt=window_start))
+    return len(ranked)
+
+
+def trending_books():
+    """
+    The current ranking of books still available, as rendered by
+    BookListSerializer. Served from the cache, so reads don't depend on the
+    number of books or the activity; a book deleted, sold out or repriced
+    since moves the catalog version and so the cache key.
+    """
+    key = cache_key()
+    books = cache.get(key)
+    if books is None:
+        ranking = (
+            TrendingBook.objects.filter(book__is_available=True)
+            .select_related('book__author', 'book__editorial', 'book__seller')
+        )
+        books = list(BookListSerializer([entry.book for entry in ranking], many=True).data)
+        cache.set(key, books, settings.TRENDING_CACHE_TIMEOUT)
+    return books
@@ -2,16 +2,40 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
+from rest_framework.authentication import BasicAuthentication
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.views.decorators.http import require_safe
+from django.db.models import (
+    Count, DecimalField, F, OuterRef, Prefetch, Q, Subquery, Sum, Value, prefetch_related_objects
+)
+from django.db.models.functions import Coalesce
+from datetime import date
 from decimal import Decimal
 import logging
-from .models import Author, Editorial, Book, Cart, CartItem
+from . import catalog, guest_cart, reservations
+from .authentication import GuestSessionAuthentication
+from .covers import cover_file
+from .filters import BookFilterBackend
+from .history import book_series
+from .idempotency import idempotent
+from .pagination import RecentCursorPagination
+from .reference import reference_cache
+from .models import Author, Editorial, Book, Cart, CartItem, StockReservation
 from .serializers import (
     AuthorSerializer, EditorialSerializer, BookSerializer,
-    BookListSerializer, UserSerializer, CartSerializer, CartItemSerializer
+    BookListSerializer, SellerBookSerializer, UserSerializer, CartSerializer, CartItemSerializer,
+    ValuesPlan
+)
+from .throttling import (
+    AnonCatalogThrottle, LoginIPThrottle, LoginUsernameThrottle,
+    CartMutationThrottle, CheckoutThrottle
 )
+from .trending import record_activity, trending_books
 
 logger = logging.getLogger(__name__)
 
@@ -28,23 +52,126 @@ class IsOwnerOrReadOnly(IsAuthenticatedOrReadOnly):
         return obj.seller == request.user
 
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class SparseFieldsetViewMixin:
+    """
+    Narrow list/detail querysets to the columns the serializer will read,
+    honouring `?fields=` and `?expand=` (see SparseFieldsetMixin).
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'values_plan', None) is not None:
+            # .values() picks its own columns
+            return queryset
+        if self.request.method in ('GET', 'HEAD') and self.action in ('list', 'retrieve'):
+            queryset = self.get_serializer().narrow_queryset(queryset)
+        return queryset
+
+
+class ValuesListMixin:
+    """
+    Serve `list` from `.values()` rows through a ValuesPlan compiled once per
+    serializer and field selection, falling back to the regular serializer
+    when the selection has nested or computed fields.
+    """
+    values_plans = {}
+    max_values_plans = 256
+
+    def get_values_plan(self):
+        serializer_class = self.get_serializer_class()
+        params = self.request.query_params
+        key = (serializer_class, params.get('fields'), params.get('expand'))
+        try:
+            return self.values_plans[key]
+        except KeyError:
+            pass
+        plan = ValuesPlan.compile(self.get_serializer())
+        if len(self.values_plans) >= self.max_values_plans:
+            # Field selections come from clients, so don't let them pile up
+            self.values_plans.clear()
+        self.values_plans[key] = plan
+        return plan
+
+    def list(self, request, *args, **kwargs):
+        self.values_plan = self.get_values_plan()
+        if self.values_plan is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.filter_queryset(self.get_queryset()).values(*self.values_plan.keys)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.values_plan.render(page))
+        return Response(self.values_plan.render(rows))
+
+
+class ReferenceListMixin:
+    """
+    Serve `list` from the model's ReferenceCache: rendered once per field
+    selection and table version, then from memory in every process.
+    """
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        data = reference_cache(self.queryset.model).rendered(
+            (params.get('fields'), params.get('expand')),
+            lambda: super(ReferenceListMixin, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
+
+class RelatedBooksMixin:
+    """
+    `books` action: the books of one object, newest first, keyset-paginated
+    over the (`books_field`, created_at, id) index of Book.
+    """
+    books_field = None
+
+    @action(detail=True, methods=['get'])
+    def books(self, request, pk=None):
+        model = self.queryset.model
+        # The object itself is only checked for, from the ReferenceCache; the
+        # pk is validated first, as one out of the column's range would make
+        # the database raise instead of finding nothing
+        pk_field = model._meta.pk
+        try:
+            pk = pk_field.to_python(pk)
+            pk_field.run_validators(pk)
+            reference_cache(model).get(pk)
+        except (DjangoValidationError, model.DoesNotExist):
+            raise Http404(f'No {model._meta.verbose_name} matches the given query.')
+
+        context = self.get_serializer_context()
+        queryset = BookListSerializer(context=context).narrow_queryset(
+            Book.objects.filter(**{self.books_field: pk})
+        )
+        paginator = RecentCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = BookListSerializer(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class AuthorViewSet(RelatedBooksMixin, ReferenceListMixin, ValuesListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_classes = [AnonCatalogThrottle]
     pagination_class = None  # Disable pagination for authors (small dataset)
+    books_field = 'author'
 
 
-class EditorialViewSet(viewsets.ModelViewSet):
+class EditorialViewSet(RelatedBooksMixin, ReferenceListMixin, ValuesListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Editorial.objects.all()
     serializer_class = EditorialSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_classes = [AnonCatalogThrottle]
     pagination_class = None  # Disable pagination for editorials (small dataset)
+    books_field = 'editorial'
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ValuesListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_classes = [AnonCatalogThrottle]
+    filter_backends = [BookFilterBackend]
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -52,13 +179,142 @@ class BookViewSet(viewsets.ModelViewSet):
         return BookSerializer
 
     def get_permissions(self):
-        if self.action in ['update', 'partial_update', 'destroy']:
+        if self.action in ['update', 'partial_update', 'destroy', 'bulk']:
             return [IsOwnerOrReadOnly()]
         return super().get_permissions()
 
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
 
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Create (POST a list of books), update (PATCH a list of books, each with
+        its `id`) or delete (DELETE {"ids": [...]}) many books in one request.
+        Nothing is written unless every item is valid and, for updates and
+        deletes, every book belongs to the caller.
+        """
+        context = self.get_serializer_context()
+        if request.method == 'POST':
+            serializer = BookSerializer(data=request.data, many=True, context=context)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(seller=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        if request.method == 'PATCH':
+            items = request.data
+            ids = self.get_bulk_ids(
+                [item.get('id') if isinstance(item, dict) else None for item in items]
+                if isinstance(items, list) else None
+            )
+        else:
+            ids = self.get_bulk_ids(request.data.get('ids') if isinstance(request.data, dict) else None)
+        if isinstance(ids, Response):
+            return ids
+
+        books = Book.objects.select_related('author', 'editorial', 'seller').in_bulk(ids)
+        missing = [pk for pk in ids if pk not in books]
+        if missing:
+            return Response({'error': 'Books not found', 'ids': missing}, status=status.HTTP_404_NOT_FOUND)
+        for book in books.values():
+            self.check_object_permissions(request, book)
+
+        if request.method == 'DELETE':
+            Book.objects.filter(pk__in=ids).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        serializer = BookSerializer(
+            [books[pk] for pk in ids], data=items, many=True, partial=True, context=context
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """Price and stock series of a book, optionally limited to ?since= and ?until= dates"""
+        book = self.get_object()
+        try:
+            since, until = (
+                date.fromisoformat(request.query_params[name]) if request.query_params.get(name) else None
+                for name in ('since', 'until')
+            )
+        except ValueError:
+            return Response({'error': 'Dates must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(book_series(book, since, until))
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Books most added to carts and bought recently, precomputed by `compute_trending`"""
+        return Response(trending_books())
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def mine(self, request):
+        """The caller's own listings, newest first, with the units held in carts"""
+        # A correlated subquery keeps the page a plain range scan over the
+        # (seller, created_at) index instead of grouping the joined rows
+        in_carts = (
+            CartItem.objects.filter(book=OuterRef('pk')).order_by()
+            .values('book').annotate(total=Sum('quantity')).values('total')
+        )
+        queryset = self.filter_queryset(
+            Book.objects.filter(seller=request.user)
+            .select_related('author', 'editorial', 'seller')
+            .annotate(in_carts=Coalesce(Subquery(in_carts), 0))
+        )
+        paginator = RecentCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = SellerBookSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='mine/stats', permission_classes=[IsAuthenticated])
+    def mine_stats(self, request):
+        """Inventory totals for the caller's listings"""
+        stats = Book.objects.filter(seller=request.user).aggregate(
+            listings=Count('pk'),
+            units_in_stock=Coalesce(Sum('quantity'), 0),
+            out_of_stock=Count('pk', filter=Q(quantity=0)),
+            inventory_value=Coalesce(
+                Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        stats.update(CartItem.objects.filter(book__seller=request.user).aggregate(
+            units_in_carts=Coalesce(Sum('quantity'), 0),
+            carts=Count('cart', distinct=True),
+        ))
+        stats['inventory_value'] = str(Decimal(stats['inventory_value']).quantize(Decimal('0.01')))
+        return Response(stats)
+
+    @staticmethod
+    def get_bulk_ids(values):
+        """List of unique integer ids, or an error response"""
+        if not isinstance(values, list) or not values:
+            return Response({'error': 'A non-empty list of book ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(values) > settings.BOOK_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.BOOK_BULK_MAX_ITEMS} books per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            ids = [int(value) for value in values]
+        except (TypeError, ValueError):
+            return Response({'error': 'Every book needs an integer id'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(set(ids)) != len(ids):
+            return Response({'error': 'Book ids must be unique'}, status=status.HTTP_400_BAD_REQUEST)
+        return ids
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Counts per condition, language, author, editorial and price range for the current filters"""
+        params = {
+            name: request.query_params[name]
+            for name in BookFilterBackend.query_params
+            if request.query_params.get(name)
+        }
+        return Response(catalog.facets(self.get_queryset(), params, BookFilterBackend().apply))
+
 
 class AuthViewSet(viewsets.ViewSet):
     permission_classes = [AllowAny]
@@ -106,7 +362,7 @@ class AuthViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_classes=[LoginIPThrottle, LoginUsernameThrottle])
     def login(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
@@ -126,8 +382,14 @@ class AuthViewSet(viewsets.ViewSet):
         if user is not None:
             login(request, user)
             logger.info(f"Login successful for {username}, session: {request.session.session_key}")
-            serializer = UserSerializer(user)
-            return Response(serializer.data)
+            adjusted = guest_cart.merge(request.session, user)
+            data = UserSerializer(user).data
+            if adjusted:
+                # Guest cart lines cut down to the copies left in stock
+                data['cart_adjusted'] = [
+                    {'book_id': book_id, 'quantity': quantity} for book_id, quantity in adjusted.items()
+                ]
+            return Response(data)
         else:
             logger.warning(f"Login failed: invalid credentials for {username}")
             return Response(
@@ -153,20 +415,73 @@ class AuthViewSet(viewsets.ViewSet):
 
 
 class CartViewSet(viewsets.ViewSet):
-    permission_classes = [IsAuthenticated]
+    """
+    The user's cart. Anonymous visitors get a guest cart kept in their
+    session, which holds no stock and is merged into the user's cart on
+    login; only checkout requires logging in.
+    """
+    authentication_classes = [GuestSessionAuthentication, BasicAuthentication]
+    permission_classes = [AllowAny]
+    throttle_classes = [CartMutationThrottle]
 
     def get_cart(self, user):
         """Get or create cart for user"""
         cart, created = Cart.objects.get_or_create(user=user)
         return cart
 
+    @staticmethod
+    def wants_cart(request):
+        """Mutations return the whole updated cart when called with ?return=cart"""
+        return request.query_params.get('return') == 'cart'
+
+    def cart_response(self, request, cart, status_code=status.HTTP_200_OK):
+        """
+        The whole cart as `list` renders it, read inside the mutation's
+        transaction: the items in one query and the total summed by the
+        database.
+        """
+        serializer = CartSerializer(cart, context={'request': request})
+        queryset = serializer.fields['items'].child.narrow_queryset(CartItem.objects.all(), 'cart')
+        prefetch_related_objects([cart], Prefetch('items', queryset=queryset))
+        money = DecimalField(max_digits=12, decimal_places=2)
+        cart.items_total = CartItem.objects.filter(cart=cart).aggregate(
+            total=Coalesce(Sum(F('quantity') * F('book__price'), output_field=money), Value(Decimal('0')), output_field=money)
+        )['total']
+        return Response(serializer.data, status=status_code)
+
+    def guest_response(self, request, items, status_code=status.HTTP_200_OK):
+        """The session's guest cart, rendered like a saved cart"""
+        lines = guest_cart.cart_items(items)
+        return Response({
+            'id': None,
+            'user': None,
+            'items': CartItemSerializer(lines, many=True, context={'request': request}).data,
+            'total': sum((line.get_subtotal() for line in lines), Decimal('0')),
+            'created_at': None,
+            'updated_at': None,
+        }, status=status_code)
+
+    def guest_item_response(self, request, items, book_id, status_code=status.HTTP_200_OK):
+        if self.wants_cart(request):
+            return self.guest_response(request, items, status_code)
+        line, = guest_cart.cart_items({book_id: items[book_id]})
+        return Response(CartItemSerializer(line).data, status=status_code)
+
     def list(self, request):
         """Get current user's cart"""
+        if not request.user.is_authenticated:
+            return self.guest_response(request, guest_cart.get_items(request.session))
         cart = self.get_cart(request.user)
-        serializer = CartSerializer(cart)
+        serializer = CartSerializer(cart, context={'request': request})
+        items = serializer.fields.get('items')
+        if items is not None:
+            # One query for the items and the book columns they render
+            queryset = items.child.narrow_queryset(CartItem.objects.all(), 'cart')
+            prefetch_related_objects([cart], Prefetch('items', queryset=queryset))
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
+    @idempotent
     def add_item(self, request):
         """Add item to cart"""
         book_id = request.data.get('book_id')
@@ -178,50 +493,96 @@ class CartViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            book = Book.objects.get(id=book_id)
-        except Book.DoesNotExist:
-            return Response(
-                {'error': 'Book not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
         if quantity <= 0:
             return Response(
                 {'error': 'Quantity must be greater than 0'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if book.quantity < quantity:
-            return Response(
-                {'error': f'Only {book.quantity} copies available'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if not request.user.is_authenticated:
+            return self.guest_add_item(request, book_id, quantity)
 
         cart = self.get_cart(request.user)
 
-        # Check if item already exists in cart
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            book=book,
-            defaults={'quantity': quantity}
-        )
+        with transaction.atomic():
+            # Lock the book row so concurrent carts can't reserve the same copies
+            try:
+                book = Book.objects.select_for_update().get(id=book_id)
+            except Book.DoesNotExist:
+                return Response(
+                    {'error': 'Book not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
 
-        if not created:
-            # Update quantity if item exists
-            new_quantity = cart_item.quantity + quantity
-            if new_quantity > book.quantity:
+            available = reservations.available_quantity(book, exclude_cart=cart)
+            if available < quantity:
                 return Response(
-                    {'error': f'Cannot add {quantity} more. Only {book.quantity - cart_item.quantity} available'},
+                    {'error': f'Only {available} copies available'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            cart_item.quantity = new_quantity
-            cart_item.save()
+
+            # Check if item already exists in cart
+            cart_item, created = CartItem.objects.get_or_create(
+                cart=cart,
+                book=book,
+                defaults={'quantity': quantity, 'added_price': book.price}
+            )
+
+            if not created:
+                # Update quantity if item exists
+                new_quantity = cart_item.quantity + quantity
+                if new_quantity > available:
+                    return Response(
+                        {'error': f'Cannot add {quantity} more. Only {available - cart_item.quantity} available'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                cart_item.quantity = new_quantity
+                cart_item.save()
+
+            reservations.reserve(cart, book, cart_item.quantity)
+            record_activity('adds', {book.id: 1})
+
+            status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            if self.wants_cart(request):
+                return self.cart_response(request, cart, status_code)
 
         serializer = CartItemSerializer(cart_item)
-        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+        return Response(serializer.data, status=status_code)
+
+    def guest_add_item(self, request, book_id, quantity):
+        """add_item for the guest cart, checked against the stock not held by any cart"""
+        try:
+            book = Book.objects.only('id', 'quantity').get(id=book_id)
+        except Book.DoesNotExist:
+            return Response(
+                {'error': 'Book not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        items = guest_cart.get_items(request.session)
+        in_cart = items.get(book.id, 0)
+        if not in_cart and len(items) >= guest_cart.MAX_LINES:
+            return Response(
+                {'error': f'A guest cart holds at most {guest_cart.MAX_LINES} books. Log in to add more'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        available = reservations.available_quantity(book)
+        if in_cart + quantity > available:
+            error = (
+                f'Cannot add {quantity} more. Only {max(available - in_cart, 0)} available' if in_cart
+                else f'Only {available} copies available'
+            )
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        items[book.id] = in_cart + quantity
+        guest_cart.save_items(request.session, items)
+        record_activity('adds', {book.id: 1})
+        status_code = status.HTTP_200_OK if in_cart else status.HTTP_201_CREATED
+        return self.guest_item_response(request, items, book.id, status_code)
 
     @action(detail=False, methods=['put', 'patch'])
+    @idempotent
     def update_item(self, request):
         """Update quantity of item in cart"""
         book_id = request.data.get('book_id')
@@ -239,35 +600,72 @@ class CartViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if not request.user.is_authenticated:
+            return self.guest_update_item(request, book_id, quantity)
+
+        cart = self.get_cart(request.user)
+
+        with transaction.atomic():
+            try:
+                book = Book.objects.select_for_update().get(id=book_id)
+            except Book.DoesNotExist:
+                return Response(
+                    {'error': 'Book not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            try:
+                cart_item = CartItem.objects.get(cart=cart, book=book)
+            except CartItem.DoesNotExist:
+                return Response(
+                    {'error': 'Item not found in cart'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            available = reservations.available_quantity(book, exclude_cart=cart)
+            if quantity > available:
+                return Response(
+                    {'error': f'Only {available} copies available'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            cart_item.quantity = quantity
+            cart_item.save()
+            reservations.reserve(cart, book, quantity)
+
+            if self.wants_cart(request):
+                return self.cart_response(request, cart)
+
+        serializer = CartItemSerializer(cart_item)
+        return Response(serializer.data)
+
+    def guest_update_item(self, request, book_id, quantity):
+        """update_item for the guest cart"""
         try:
-            book = Book.objects.get(id=book_id)
+            book = Book.objects.only('id', 'quantity').get(id=book_id)
         except Book.DoesNotExist:
             return Response(
                 {'error': 'Book not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        cart = self.get_cart(request.user)
-
-        try:
-            cart_item = CartItem.objects.get(cart=cart, book=book)
-        except CartItem.DoesNotExist:
+        items = guest_cart.get_items(request.session)
+        if book.id not in items:
             return Response(
                 {'error': 'Item not found in cart'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if quantity > book.quantity:
+        available = reservations.available_quantity(book)
+        if quantity > available:
             return Response(
-                {'error': f'Only {book.quantity} copies available'},
+                {'error': f'Only {available} copies available'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        cart_item.quantity = quantity
-        cart_item.save()
-
-        serializer = CartItemSerializer(cart_item)
-        return Response(serializer.data)
+        items[book.id] = quantity
+        guest_cart.save_items(request.session, items)
+        return self.guest_item_response(request, items, book.id)
 
     @action(detail=False, methods=['delete'])
     def remove_item(self, request):
@@ -288,69 +686,145 @@ class CartViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        if not request.user.is_authenticated:
+            items = guest_cart.get_items(request.session)
+            if items.pop(book.id, None) is None:
+                return Response(
+                    {'error': 'Item not found in cart'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            guest_cart.save_items(request.session, items)
+            if self.wants_cart(request):
+                return self.guest_response(request, items)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
         cart = self.get_cart(request.user)
 
-        try:
-            cart_item = CartItem.objects.get(cart=cart, book=book)
-            cart_item.delete()
-            return Response({'message': 'Item removed from cart'}, status=status.HTTP_204_NO_CONTENT)
-        except CartItem.DoesNotExist:
-            return Response(
-                {'error': 'Item not found in cart'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        with transaction.atomic():
+            deleted, _ = CartItem.objects.filter(cart=cart, book=book).delete()
+            if not deleted:
+                return Response(
+                    {'error': 'Item not found in cart'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            reservations.release(cart, book)
+
+            if self.wants_cart(request):
+                return self.cart_response(request, cart)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['post'])
+    @idempotent
     def clear(self, request):
         """Clear entire cart"""
-        cart = self.get_cart(request.user)
-        cart.items.all().delete()
-        return Response({'message': 'Cart cleared'})
+        if not request.user.is_authenticated:
+            guest_cart.save_items(request.session, {})
+            if self.wants_cart(request):
+                return self.guest_response(request, {})
+            return Response({'message': 'Cart cleared'})
 
-    @action(detail=False, methods=['post'])
-    def checkout(self, request):
-        """Process checkout - reduce book quantities and clear cart"""
         cart = self.get_cart(request.user)
+        with transaction.atomic():
+            cart.items.all().delete()
+            reservations.release(cart)
 
-        if not cart.items.exists():
-            return Response(
-                {'error': 'Cart is empty'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            if self.wants_cart(request):
+                return self.cart_response(request, cart)
+        return Response({'message': 'Cart cleared'})
 
-        # Validate all items have sufficient quantity
-        errors = []
-        for item in cart.items.all():
-            if item.quantity > item.book.quantity:
-                errors.append(f'Not enough copies of "{item.book.title}". Available: {item.book.quantity}, Requested: {item.quantity}')
+    @staticmethod
+    def checkout_lines(cart):
+        """
+        The cart's items with their books locked, each annotated with the
+        units of its book held by other carts: one joined query
+        """
+        held = (
+            StockReservation.objects.active()
+            .filter(book=OuterRef('book'))
+            .exclude(cart=cart)
+            .values('book')
+            .annotate(total=Sum('quantity'))
+            .values('total')
+        )
+        return list(
+            CartItem.objects.filter(cart=cart)
+            .select_related('book')
+            .select_for_update(of=('book',))
+            .annotate(held=Coalesce(Subquery(held), 0))
+        )
 
-        if errors:
-            return Response(
-                {'errors': errors},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    @staticmethod
+    def line_result(item):
+        """What checkout found for one cart item"""
+        available = max(item.book.quantity - item.held, 0)
+        price_changed = item.added_price is not None and item.added_price != item.book.price
+        return {
+            'book_id': item.book_id,
+            'title': item.book.title,
+            'requested': item.quantity,
+            'available': available,
+            'price': str(item.book.price),
+            'added_price': str(item.added_price) if item.added_price is not None else None,
+            'price_changed': price_changed,
+            'ok': item.quantity <= available,
+        }
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        throttle_classes=[CartMutationThrottle, CheckoutThrottle],
+    )
+    @idempotent
+    def checkout(self, request):
+        """
+        Process checkout - reduce book quantities and clear cart. When some
+        items can't be bought, every line is reported with its requested and
+        available quantity and any price change, so the client can fix the
+        whole cart at once.
+        """
+        cart = self.get_cart(request.user)
 
-        # Process checkout
-        purchased_items = []
-        # Calculate total before clearing cart
-        total = cart.get_total()
-        
         try:
             with transaction.atomic():
-                for item in cart.items.all():
+                items = self.checkout_lines(cart)
+                if not items:
+                    return Response(
+                        {'error': 'Cart is empty'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                lines = [self.line_result(item) for item in items]
+                errors = [
+                    f'Not enough copies of "{line["title"]}". Available: {line["available"]}, Requested: {line["requested"]}'
+                    for line in lines if not line['ok']
+                ]
+                if errors:
+                    return Response(
+                        {'errors': errors, 'lines': lines},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                purchased_items = []
+                for item, line in zip(items, lines):
                     # Reduce book quantity
                     item.book.quantity -= item.quantity
-                    item.book.save()  # This will update is_available automatically
-
                     purchased_items.append({
                         'book': item.book.title,
                         'quantity': item.quantity,
-                        'price': str(item.book.price),
-                        'subtotal': str(item.get_subtotal())
+                        'price': line['price'],
+                        'subtotal': str(item.get_subtotal()),
+                        'price_changed': line['price_changed'],
                     })
+                total = sum(item.get_subtotal() for item in items)
+
+                # One UPDATE for all books, plus their outbox and history rows
+                Book.objects.update_many([item.book for item in items], ['quantity'])
+                record_activity('purchases', {item.book_id: item.quantity for item in items})
 
-                # Clear cart
-                cart.items.all().delete()
+                # Clear cart and the stock it was holding
+                CartItem.objects.filter(cart=cart).delete()
+                reservations.release(cart)
 
             return Response({
                 'message': 'Checkout successful',
@@ -363,3 +837,23 @@ class CartViewSet(viewsets.ViewSet):
                 {'error': f'Checkout failed: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+@require_safe
+def cover(request, path):
+    """
+    Serve a rendered book cover. The file name carries the hash of the
+    image, so a URL always names the same bytes and can be cached forever.
+    """
+    file_path = cover_file(path)
+    if file_path is None:
+        raise Http404('No such cover')
+    etag = '"%s"' % path.rsplit('/', 1)[-1]
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        content_type = 'image/webp' if path.endswith('.webp') else 'image/jpeg'
+        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,91 @@
+import brotli
+from django.conf import settings
+from django.middleware.csrf import get_token
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Brotli/gzip compression for API responses.
+
+    Only responses whose media type is in COMPRESSION_CONTENT_TYPES and whose
+    body is at least COMPRESSION_MIN_SIZE bytes are compressed; Brotli is
+    preferred when the client accepts it. Responses rendered with a CSRF
+    token (anything that called get_token(), such as /api/csrf-token/ or a
+    {% csrf_token %} form) are never compressed, since a secret reflected in
+    a compressed body next to attacker-controlled input is what BREACH
+    exploits. gzip output additionally keeps Django's random-length padding.
+    """
+
+    def process_response(self, request, response):
+        if not self.should_compress(request, response):
+            return response
+
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if response.streaming or not re_accepts_brotli.search(ae):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed_content = brotli.compress(
+            response.content,
+            mode=brotli.MODE_TEXT,
+            quality=settings.COMPRESSION_BROTLI_QUALITY,
+        )
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+    def should_compress(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return False
+        if request.META.get("CSRF_TOKEN_IN_BODY"):
+            return False
+        media_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if media_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return False
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return False
+        return True
+
+
+class CsrfTokenHeaderMiddleware:
+    """
+    Hand the CSRF token to the frontend in an `X-CSRFToken` response header.
+
+    The frontend runs on another domain, so it can't read the csrftoken
+    cookie. Instead of a separate /api/csrf-token/ round trip, API responses
+    carry the token whenever the client has no CSRF cookie yet, or the view
+    fetched or rotated the token (e.g. on login). Must sit below
+    CsrfViewMiddleware so the cookie is set on the same response.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        had_cookie = "CSRF_COOKIE" in request.META
+        response = self.get_response(request)
+
+        # The view used the token, so it may be echoed in the body. Views
+        # decorated with csrf_protect have already set the cookie and cleared
+        # the flag by now.
+        used = (
+            bool(request.META.get("CSRF_COOKIE_NEEDS_UPDATE"))
+            or settings.CSRF_COOKIE_NAME in response.cookies
+        )
+        request.META["CSRF_TOKEN_IN_BODY"] = used
+
+        if request.path.startswith("/api/") and (used or not had_cookie):
+            response.headers["X-CSRFToken"] = get_token(request)
+        return response
@@ -51,10 +51,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "bookstore.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
+    "bookstore.middleware.CsrfTokenHeaderMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
@@ -147,11 +149,46 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Book cover thumbnails written by `manage.py ingest_covers`. Their file names
+# carry a content hash, so they are served with immutable cache headers.
+COVER_ROOT = Path(os.environ.get("COVER_ROOT", BASE_DIR / "media" / "covers"))
+COVER_URL = "/covers/"
+
+# Response compression (bookstore/middleware.py); static files are
+# precompressed by WhiteNoise instead.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 5))
+COMPRESSION_CONTENT_TYPES = [
+    "application/json",
+    "text/html",
+    "text/plain",
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cache
+# Throttle counters (and anything else that must agree across gunicorn workers)
+# live here, so production should point REDIS_URL at a shared Redis instance.
+# Without it every process gets its own local-memory cache, which is what the
+# test suite and single-process development use.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "bookstore",
+        }
+    }
+
 # REST Framework configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
@@ -161,10 +198,59 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "books.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
+    # Proxies in front of the app, whose X-Forwarded-For entries are trusted
+    # when throttles identify a client: Render's proxy in production, none
+    # locally. Unset, DRF would key on the whole client-supplied header.
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 0 if DEBUG else 1)),
+    # Scopes used by the throttles in books/throttling.py
+    "DEFAULT_THROTTLE_RATES": {
+        "anon_catalog": os.environ.get("THROTTLE_ANON_CATALOG", "300/min"),
+        "login_ip": os.environ.get("THROTTLE_LOGIN_IP", "20/min"),
+        "login_username": os.environ.get("THROTTLE_LOGIN_USERNAME", "10/min"),
+        "cart": os.environ.get("THROTTLE_CART", "120/min"),
+        "checkout": os.environ.get("THROTTLE_CHECKOUT", "10/min"),
+    },
 }
 
+# Seconds that books added to a cart stay reserved for it (see books/reservations.py)
+CART_RESERVATION_TTL = int(os.environ.get("CART_RESERVATION_TTL", 15 * 60))
+
+# Hours a cart mutation's response is kept for replay under its
+# Idempotency-Key (see books/idempotency.py)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
+# Days processed outbox events are kept before cleanup_carts prunes them
+# (see books/cleanup.py); events that ran out of attempts are kept
+OUTBOX_RETENTION_DAYS = int(os.environ.get("OUTBOX_RETENTION_DAYS", 7))
+
+# Upper bound on how long facet counts are cached; catalog changes invalidate
+# them sooner by bumping the catalog version (see books/catalog.py)
+CATALOG_FACETS_TIMEOUT = int(os.environ.get("CATALOG_FACETS_TIMEOUT", 60 * 60))
+
+# Largest list accepted by the bulk book endpoint (/api/books/bulk/)
+BOOK_BULK_MAX_ITEMS = int(os.environ.get("BOOK_BULK_MAX_ITEMS", 500))
+
+# Trending ranking (books/trending.py): activity older than the window is
+# ignored and dropped, and each hour's activity counts half as much every
+# half-life. The ranking is served from the cache between recomputations
+# and catalog changes.
+TRENDING_WINDOW_DAYS = int(os.environ.get("TRENDING_WINDOW_DAYS", 7))
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", 24))
+TRENDING_SIZE = int(os.environ.get("TRENDING_SIZE", 50))
+TRENDING_CACHE_TIMEOUT = int(os.environ.get("TRENDING_CACHE_TIMEOUT", 60 * 60))
+
+# Authors and editorials are cached in each process (books/reference.py):
+# objects and rendered lists kept per process and table, and how long the
+# rendered lists stay in the shared cache. Changes invalidate both sooner.
+REFERENCE_CACHE_SIZE = int(os.environ.get("REFERENCE_CACHE_SIZE", 1024))
+REFERENCE_CACHE_TIMEOUT = int(os.environ.get("REFERENCE_CACHE_TIMEOUT", 60 * 60))
+
 # CORS configuration
 cors_origins_env = os.environ.get(
     "CORS_ALLOWED_ORIGINS",
@@ -193,12 +279,19 @@ CORS_ALLOW_METHODS = [
     "PUT",
 ]
 
+# Lets the frontend read the token set by CsrfTokenHeaderMiddleware
+CORS_EXPOSE_HEADERS = [
+    "x-csrftoken",
+    "idempotent-replayed",
+]
+
 CORS_ALLOW_HEADERS = [
     "accept",
     "accept-encoding",
     "authorization",
     "content-type",
     "dnt",
+    "idempotency-key",
     "origin",
     "user-agent",
     "x-csrftoken",
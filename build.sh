@@ -4,8 +4,6 @@ set -o errexit
 
 pip install -r requirements.txt
 
-python manage.py collectstatic --no-input
-python manage.py migrate
-
-# Only populate database if it's empty
-python manage.py shell -c "from books.models import Book; exit(0 if Book.objects.count() > 0 else 1)" 2>/dev/null || python manage.py populate_db
+# Collect static files, migrate, populate an empty database and warm up,
+# all in one Django process
+python manage.py bootstrap --collectstatic
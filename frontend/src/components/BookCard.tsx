@@ -1,7 +1,7 @@
 import { useState } from 'react';
 import { Link } from 'react-router-dom';
 import type { BookList } from '../types';
-import { getBookCoverUrl } from '../utils/bookCover';
+import { getBookCoverSrcSet, getBookCoverUrl } from '../utils/bookCover';
 
 interface BookCardProps {
   book: BookList;
@@ -17,7 +17,7 @@ const conditionColors: Record<string, string> = {
 
 export default function BookCard({ book }: BookCardProps) {
   const [imageError, setImageError] = useState(false);
-  const coverUrl = getBookCoverUrl(book.isbn, 'M');
+  const coverUrl = getBookCoverUrl(book, 'M');
 
   return (
     <Link to={`/books/${book.id}`} className="card block">
@@ -25,6 +25,8 @@ export default function BookCard({ book }: BookCardProps) {
         {!imageError ? (
           <img
             src={coverUrl}
+            srcSet={getBookCoverSrcSet(book)}
+            sizes="(min-width: 1024px) 240px, 50vw"
             alt={`${book.title} cover`}
             className="w-full h-full object-contain bg-white"
             onError={() => setImageError(true)}
@@ -12,7 +12,7 @@ export default function CartItem({ item }: CartItemProps) {
   const { updateCartItem, removeFromCart, isLoading } = useCartStore();
   const maxQuantity = Math.min(item.book.quantity, 10);
   const [imageError, setImageError] = useState(false);
-  const coverUrl = getBookCoverUrl(item.book.isbn, 'S');
+  const coverUrl = getBookCoverUrl(item.book, 'S');
 
   const handleQuantityChange = async (newQuantity: number) => {
     if (newQuantity < 1) return;
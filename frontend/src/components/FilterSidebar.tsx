@@ -1,6 +1,16 @@
 import { useEffect } from 'react';
+import { useQuery } from '@tanstack/react-query';
 import { useBookStore } from '../stores/bookStore';
 import { authorService } from '../services/authorService';
+import { bookService } from '../services/bookService';
+
+const CONDITIONS = [
+  { value: 'new', label: 'New' },
+  { value: 'like_new', label: 'Like New' },
+  { value: 'good', label: 'Good' },
+  { value: 'fair', label: 'Fair' },
+  { value: 'poor', label: 'Poor' },
+];
 
 export default function FilterSidebar() {
   const { filters, authors, setFilter, resetFilters, setAuthors } = useBookStore();
@@ -24,6 +34,24 @@ export default function FilterSidebar() {
     loadAuthors();
   }, [setAuthors]);
 
+  const { data: facets } = useQuery({
+    queryKey: ['bookFacets', filters],
+    queryFn: () => bookService.getFacets({
+      search: filters.search || undefined,
+      author: filters.author ?? undefined,
+      condition: filters.condition ?? undefined,
+      min_price: filters.minPrice ?? undefined,
+      max_price: filters.maxPrice ?? undefined,
+    }),
+    staleTime: 60 * 1000,
+  });
+
+  const countFor = (facet: 'author' | 'condition', value: number | string) => {
+    // Only the most common authors are counted, so a missing one shows no count
+    const match = facets?.[facet].find((item) => item.value === value);
+    return match ? ` (${match.count})` : '';
+  };
+
   return (
     <div className="bg-white p-6 rounded-lg shadow-md">
       <div className="flex justify-between items-center mb-4">
@@ -49,7 +77,7 @@ export default function FilterSidebar() {
             <option value="">All Authors</option>
             {Array.isArray(authors) && authors.map((author) => (
               <option key={author.id} value={author.id}>
-                {author.name}
+                {author.name}{countFor('author', author.id)}
               </option>
             ))}
           </select>
@@ -65,11 +93,11 @@ export default function FilterSidebar() {
             className="input"
           >
             <option value="">All Conditions</option>
-            <option value="new">New</option>
-            <option value="like_new">Like New</option>
-            <option value="good">Good</option>
-            <option value="fair">Fair</option>
-            <option value="poor">Poor</option>
+            {CONDITIONS.map((condition) => (
+              <option key={condition.value} value={condition.value}>
+                {condition.label}{countFor('condition', condition.value)}
+              </option>
+            ))}
           </select>
         </div>
 
@@ -9,10 +9,12 @@ export default function Navbar() {
 
   useEffect(() => {
     checkAuth();
-    if (isAuthenticated) {
-      fetchCart();
-    }
-  }, [isAuthenticated, checkAuth, fetchCart]);
+  }, [checkAuth]);
+
+  // Refetch on login and logout: logging in merges the guest cart
+  useEffect(() => {
+    fetchCart();
+  }, [isAuthenticated, fetchCart]);
 
   const cartItemCount = getCartItemCount();
 
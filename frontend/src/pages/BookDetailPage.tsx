@@ -1,9 +1,10 @@
 import { useState } from 'react';
-import { useParams, useNavigate } from 'react-router-dom';
+import { useParams } from 'react-router-dom';
 import { useQuery } from '@tanstack/react-query';
+import { authorService } from '../services/authorService';
 import { bookService } from '../services/bookService';
 import { useCartStore } from '../stores/cartStore';
-import { useAuthStore } from '../stores/authStore';
+import BookList from '../components/BookList';
 import LoadingSpinner from '../components/LoadingSpinner';
 import ErrorMessage from '../components/ErrorMessage';
 import { getBookCoverUrl } from '../utils/bookCover';
@@ -18,8 +19,6 @@ const conditionLabels: Record<string, string> = {
 
 export default function BookDetailPage() {
   const { id } = useParams<{ id: string }>();
-  const navigate = useNavigate();
-  const { isAuthenticated } = useAuthStore();
   const { addToCart, isLoading: cartLoading } = useCartStore();
   const [quantity, setQuantity] = useState(1);
   const [error, setError] = useState<string | null>(null);
@@ -32,12 +31,15 @@ export default function BookDetailPage() {
     enabled: !!id,
   });
 
-  const handleAddToCart = async () => {
-    if (!isAuthenticated) {
-      navigate('/login');
-      return;
-    }
+  // First page of the author's books, newest first
+  const { data: authorBooks } = useQuery({
+    queryKey: ['author-books', book?.author.id],
+    queryFn: () => authorService.getAuthorBooks(book!.author.id, { page_size: 5 }),
+    enabled: !!book,
+  });
+  const moreByAuthor = (authorBooks?.results ?? []).filter((other) => other.id !== book?.id).slice(0, 4);
 
+  const handleAddToCart = async () => {
     setError(null);
     setSuccess(false);
 
@@ -63,7 +65,7 @@ export default function BookDetailPage() {
   }
 
   const maxQuantity = Math.min(book.quantity, 10);
-  const coverUrl = getBookCoverUrl(book.isbn, 'L');
+  const coverUrl = getBookCoverUrl(book, 'L');
 
   return (
     <div className="container mx-auto px-4 py-8">
@@ -163,6 +165,13 @@ export default function BookDetailPage() {
           )}
         </div>
       </div>
+
+      {moreByAuthor.length > 0 && (
+        <div className="mt-12">
+          <h2 className="text-2xl font-bold mb-6">More by {book.author.name}</h2>
+          <BookList books={moreByAuthor} />
+        </div>
+      )}
     </div>
   );
 }
@@ -1,5 +1,5 @@
 import { useEffect } from 'react';
-import { Link, useNavigate } from 'react-router-dom';
+import { Link } from 'react-router-dom';
 import { useCartStore } from '../stores/cartStore';
 import { useAuthStore } from '../stores/authStore';
 import CartItem from '../components/CartItem';
@@ -7,21 +7,13 @@ import LoadingSpinner from '../components/LoadingSpinner';
 import ErrorMessage from '../components/ErrorMessage';
 
 export default function CartPage() {
-  const navigate = useNavigate();
   const { isAuthenticated } = useAuthStore();
   const { cart, fetchCart, clearCart, isLoading, error } = useCartStore();
 
+  // Guests get the cart kept in their session, merged into theirs on login
   useEffect(() => {
-    if (!isAuthenticated) {
-      navigate('/login');
-      return;
-    }
     fetchCart();
-  }, [isAuthenticated, navigate, fetchCart]);
-
-  if (!isAuthenticated) {
-    return null;
-  }
+  }, [isAuthenticated, fetchCart]);
 
   if (isLoading && !cart) {
     return <LoadingSpinner />;
@@ -65,7 +57,7 @@ export default function CartPage() {
         <div className="lg:col-span-2">
           <div className="bg-white rounded-lg shadow-md">
             {cart.items.map((item) => (
-              <CartItem key={item.id} item={item} />
+              <CartItem key={item.book.id} item={item} />
             ))}
           </div>
         </div>
@@ -86,10 +78,10 @@ export default function CartPage() {
               </div>
             </div>
             <Link
-              to="/checkout"
+              to={isAuthenticated ? '/checkout' : '/login'}
               className="btn-primary w-full text-center block"
             >
-              Proceed to Checkout
+              {isAuthenticated ? 'Proceed to Checkout' : 'Log in to Checkout'}
             </Link>
             <Link
               to="/books"
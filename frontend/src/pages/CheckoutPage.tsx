@@ -3,12 +3,14 @@ import { useNavigate } from 'react-router-dom';
 import { useCartStore } from '../stores/cartStore';
 import { useAuthStore } from '../stores/authStore';
 import ErrorMessage from '../components/ErrorMessage';
+import type { CheckoutError, CheckoutLine } from '../types';
 
 export default function CheckoutPage() {
   const navigate = useNavigate();
   const { isAuthenticated } = useAuthStore();
-  const { cart, checkout, isLoading, error } = useCartStore();
+  const { cart, checkout, fixCart, isLoading, error } = useCartStore();
   const [checkoutError, setCheckoutError] = useState<string | null>(null);
+  const [problemLines, setProblemLines] = useState<CheckoutLine[]>([]);
   const [checkoutSuccess, setCheckoutSuccess] = useState(false);
 
   // All hooks must be called before any early returns
@@ -24,6 +26,7 @@ export default function CheckoutPage() {
 
   const handleCheckout = async () => {
     setCheckoutError(null);
+    setProblemLines([]);
     try {
       await checkout();
       setCheckoutSuccess(true);
@@ -31,7 +34,19 @@ export default function CheckoutPage() {
         navigate('/');
       }, 3000);
     } catch (err: any) {
-      setCheckoutError(err.error || err.errors?.join(', ') || 'Checkout failed');
+      const checkoutErr = err as CheckoutError;
+      setCheckoutError(checkoutErr.error || checkoutErr.errors?.join(', ') || 'Checkout failed');
+      setProblemLines((checkoutErr.lines || []).filter((line) => !line.ok || line.price_changed));
+    }
+  };
+
+  const handleFixCart = async () => {
+    try {
+      await fixCart(problemLines);
+      setCheckoutError(null);
+      setProblemLines([]);
+    } catch (err: any) {
+      setCheckoutError(err.error || 'Failed to update cart');
     }
   };
 
@@ -57,13 +72,32 @@ export default function CheckoutPage() {
         <ErrorMessage message={checkoutError || error || ''} />
       )}
 
+      {problemLines.length > 0 && (
+        <div className="bg-yellow-50 border border-yellow-200 rounded-lg p-4 mb-6">
+          <ul className="space-y-1 text-sm mb-3">
+            {problemLines.map((line) => (
+              <li key={line.book_id}>
+                <span className="font-semibold">{line.title}</span>
+                {!line.ok && ` - ${line.available} of ${line.requested} available`}
+                {line.price_changed && ` - price changed from $${line.added_price} to $${line.price}`}
+              </li>
+            ))}
+          </ul>
+          {problemLines.some((line) => !line.ok) && (
+            <button onClick={handleFixCart} disabled={isLoading} className="btn-secondary">
+              Update cart to available copies
+            </button>
+          )}
+        </div>
+      )}
+
       <div className="grid grid-cols-1 lg:grid-cols-3 gap-8">
         <div className="lg:col-span-2">
           <div className="bg-white rounded-lg shadow-md p-6 mb-6">
             <h2 className="text-xl font-semibold mb-4">Order Items</h2>
             <div className="space-y-4">
               {cart.items.map((item) => (
-                <div key={item.id} className="flex justify-between items-center border-b pb-4">
+                <div key={item.book.id} className="flex justify-between items-center border-b pb-4">
                   <div>
                     <h3 className="font-semibold">{item.book.title}</h3>
                     <p className="text-sm text-gray-600">Quantity: {item.quantity}</p>
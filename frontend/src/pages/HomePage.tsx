@@ -12,6 +12,12 @@ export default function HomePage() {
     queryFn: () => bookService.getAllBooks({ search: searchQuery }),
   });
 
+  const { data: trending = [], isLoading: trendingLoading } = useQuery({
+    queryKey: ['books', 'trending'],
+    queryFn: bookService.getTrending,
+    staleTime: 5 * 60 * 1000,
+  });
+
   const books = data?.results || [];
 
   return (
@@ -24,6 +30,13 @@ export default function HomePage() {
         <SearchBar onSearch={setSearchQuery} />
       </div>
 
+      {!searchQuery && (trendingLoading || trending.length > 0) && (
+        <div className="mb-10">
+          <h2 className="text-2xl font-semibold mb-4">Trending This Week</h2>
+          <BookList books={trending.slice(0, 4)} isLoading={trendingLoading} />
+        </div>
+      )}
+
       <div className="mb-6">
         <h2 className="text-2xl font-semibold mb-4">Featured Books</h2>
         <BookList books={books.slice(0, 8)} isLoading={isLoading} />
@@ -1,4 +1,5 @@
 import axios from 'axios';
+import type { AxiosResponseHeaders, RawAxiosResponseHeaders } from 'axios';
 import type { ApiError } from '../types';
 
 // Determine API URL at runtime (not build time)
@@ -33,6 +34,9 @@ const API_BASE_URL = (() => {
   return 'https://django-bookstore-ed1i.onrender.com/api';
 })();
 
+// Origin of the backend, which also serves the book covers
+export const API_ORIGIN = API_BASE_URL.replace(/\/api\/?$/, '');
+
 // Function to get CSRF token from cookies
 function getCsrfToken(): string | null {
   const name = 'csrftoken';
@@ -46,12 +50,23 @@ function getCsrfToken(): string | null {
   return null;
 }
 
+// Latest CSRF token sent by the backend in the X-CSRFToken response header.
+// The backend lives on another domain in production, so its cookie can't be read.
+let csrfToken: string | null = null;
+
+function rememberCsrfToken(headers?: RawAxiosResponseHeaders | AxiosResponseHeaders) {
+  const token = headers?.['x-csrftoken'];
+  if (typeof token === 'string' && token) {
+    csrfToken = token;
+  }
+}
+
 // Function to ensure CSRF token is available
 let csrfTokenPromise: Promise<string> | null = null;
 
 async function ensureCsrfToken(): Promise<string> {
-  // Check if token exists in cookies
-  let token = getCsrfToken();
+  // Use the token from an earlier response, or the cookie when same-origin
+  let token = csrfToken || getCsrfToken();
   if (token) {
     return token;
   }
@@ -67,6 +82,7 @@ async function ensureCsrfToken(): Promise<string> {
         if (!token) {
           throw new Error('Failed to obtain CSRF token');
         }
+        csrfToken = token;
         csrfTokenPromise = null; // Reset promise
         return token;
       })
@@ -110,15 +126,19 @@ api.interceptors.request.use(
 
 // Response interceptor
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    rememberCsrfToken(response.headers);
+    return response;
+  },
   (error) => {
     if (error.response) {
+      rememberCsrfToken(error.response.headers);
       // Server responded with error
       const apiError: ApiError = error.response.data || { error: 'An error occurred' };
       return Promise.reject(apiError);
     } else if (error.request) {
       // Request made but no response
-      return Promise.reject({ error: 'Network error. Please check your connection.' });
+      return Promise.reject({ error: 'Network error. Please check your connection.', network: true });
     } else {
       // Something else happened
       return Promise.reject({ error: error.message });
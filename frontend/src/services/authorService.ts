@@ -1,5 +1,5 @@
 import api from './api';
-import type { Author } from '../types';
+import type { Author, BookList, CursorPage } from '../types';
 
 export const authorService = {
   getAllAuthors: async (): Promise<Author[]> => {
@@ -21,6 +21,11 @@ export const authorService = {
     return response.data;
   },
 
+  getAuthorBooks: async (id: number, params?: { page_size?: number }): Promise<CursorPage<BookList>> => {
+    const response = await api.get<CursorPage<BookList>>(`/authors/${id}/books/`, { params });
+    return response.data;
+  },
+
   createAuthor: async (data: Partial<Author>): Promise<Author> => {
     const response = await api.post<Author>('/authors/', data);
     return response.data;
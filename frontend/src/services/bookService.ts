@@ -1,5 +1,5 @@
 import api from './api';
-import type { Book, BookList } from '../types';
+import type { Book, BookFacets, BookFilterParams, BookList } from '../types';
 
 export const bookService = {
   getAllBooks: async (params?: { page?: number; search?: string }): Promise<{ results: BookList[]; count: number; next?: string; previous?: string }> => {
@@ -7,6 +7,16 @@ export const bookService = {
     return response.data;
   },
 
+  getFacets: async (params?: BookFilterParams): Promise<BookFacets> => {
+    const response = await api.get<BookFacets>('/books/facets/', { params });
+    return response.data;
+  },
+
+  getTrending: async (): Promise<BookList[]> => {
+    const response = await api.get<BookList[]>('/books/trending/');
+    return response.data;
+  },
+
   getBook: async (id: number): Promise<Book> => {
     const response = await api.get<Book>(`/books/${id}/`);
     return response.data;
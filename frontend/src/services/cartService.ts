@@ -1,5 +1,26 @@
 import api from './api';
-import type { Cart, CartItem, CheckoutResponse } from '../types';
+import type { ApiError, Cart, CheckoutResponse } from '../types';
+
+// Mutations ask for the whole updated cart back, so the store can apply it
+// without fetching the cart again
+const RETURN_CART = { return: 'cart' };
+
+// Times a mutation is resent after a network error
+const MAX_RETRIES = 2;
+
+// Send a mutation with an Idempotency-Key, resending it with the same key
+// when the response was lost: the server replays the stored response
+// instead of applying the change twice
+async function idempotent<T>(send: (headers: Record<string, string>) => Promise<{ data: T }>): Promise<T> {
+  const headers = { 'Idempotency-Key': crypto.randomUUID() };
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return (await send(headers)).data;
+    } catch (error) {
+      if (!(error as ApiError).network || attempt >= MAX_RETRIES) throw error;
+    }
+  }
+}
 
 export const cartService = {
   getCart: async (): Promise<Cart> => {
@@ -7,33 +28,28 @@ export const cartService = {
     return response.data;
   },
 
-  addItem: async (bookId: number, quantity: number): Promise<CartItem> => {
-    const response = await api.post<CartItem>('/cart/add_item/', {
+  addItem: (bookId: number, quantity: number): Promise<Cart> =>
+    idempotent((headers) => api.post<Cart>('/cart/add_item/', {
       book_id: bookId,
       quantity,
-    });
-    return response.data;
-  },
+    }, { params: RETURN_CART, headers })),
 
-  updateItem: async (bookId: number, quantity: number): Promise<CartItem> => {
-    const response = await api.put<CartItem>('/cart/update_item/', {
+  updateItem: (bookId: number, quantity: number): Promise<Cart> =>
+    idempotent((headers) => api.put<Cart>('/cart/update_item/', {
       book_id: bookId,
       quantity,
+    }, { params: RETURN_CART, headers })),
+
+  removeItem: async (bookId: number): Promise<Cart> => {
+    const response = await api.delete<Cart>('/cart/remove_item/', {
+      params: { book_id: bookId, ...RETURN_CART },
     });
     return response.data;
   },
 
-  removeItem: async (bookId: number): Promise<void> => {
-    await api.delete(`/cart/remove_item/?book_id=${bookId}`);
-  },
-
-  clearCart: async (): Promise<void> => {
-    await api.post('/cart/clear/');
-  },
+  clearCart: (): Promise<Cart> =>
+    idempotent((headers) => api.post<Cart>('/cart/clear/', null, { params: RETURN_CART, headers })),
 
-  checkout: async (): Promise<CheckoutResponse> => {
-    const response = await api.post<CheckoutResponse>('/cart/checkout/');
-    return response.data;
-  },
+  checkout: (): Promise<CheckoutResponse> =>
+    idempotent((headers) => api.post<CheckoutResponse>('/cart/checkout/', null, { headers })),
 };
-
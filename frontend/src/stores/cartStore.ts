@@ -1,5 +1,5 @@
 import { create } from 'zustand';
-import type { Cart } from '../types';
+import type { Cart, CheckoutLine } from '../types';
 import { cartService } from '../services/cartService';
 
 interface CartState {
@@ -12,6 +12,7 @@ interface CartState {
   removeFromCart: (bookId: number) => Promise<void>;
   clearCart: () => Promise<void>;
   checkout: () => Promise<void>;
+  fixCart: (lines: CheckoutLine[]) => Promise<void>;
   getCartItemCount: () => number;
 }
 
@@ -33,8 +34,8 @@ export const useCartStore = create<CartState>((set, get) => ({
   addToCart: async (bookId: number, quantity: number) => {
     set({ isLoading: true, error: null });
     try {
-      await cartService.addItem(bookId, quantity);
-      await get().fetchCart();
+      const cart = await cartService.addItem(bookId, quantity);
+      set({ cart, isLoading: false });
     } catch (error: any) {
       set({ error: error.error || 'Failed to add item to cart', isLoading: false });
       throw error;
@@ -44,8 +45,8 @@ export const useCartStore = create<CartState>((set, get) => ({
   updateCartItem: async (bookId: number, quantity: number) => {
     set({ isLoading: true, error: null });
     try {
-      await cartService.updateItem(bookId, quantity);
-      await get().fetchCart();
+      const cart = await cartService.updateItem(bookId, quantity);
+      set({ cart, isLoading: false });
     } catch (error: any) {
       set({ error: error.error || 'Failed to update cart item', isLoading: false });
       throw error;
@@ -55,8 +56,8 @@ export const useCartStore = create<CartState>((set, get) => ({
   removeFromCart: async (bookId: number) => {
     set({ isLoading: true, error: null });
     try {
-      await cartService.removeItem(bookId);
-      await get().fetchCart();
+      const cart = await cartService.removeItem(bookId);
+      set({ cart, isLoading: false });
     } catch (error: any) {
       set({ error: error.error || 'Failed to remove item from cart', isLoading: false });
       throw error;
@@ -66,8 +67,8 @@ export const useCartStore = create<CartState>((set, get) => ({
   clearCart: async () => {
     set({ isLoading: true, error: null });
     try {
-      await cartService.clearCart();
-      await get().fetchCart();
+      const cart = await cartService.clearCart();
+      set({ cart, isLoading: false });
     } catch (error: any) {
       set({ error: error.error || 'Failed to clear cart', isLoading: false });
       throw error;
@@ -85,6 +86,23 @@ export const useCartStore = create<CartState>((set, get) => ({
     }
   },
 
+  // Bring every line checkout rejected down to the copies still available
+  fixCart: async (lines: CheckoutLine[]) => {
+    set({ isLoading: true, error: null });
+    try {
+      let cart = get().cart;
+      for (const line of lines.filter((line) => !line.ok)) {
+        cart = line.available > 0
+          ? await cartService.updateItem(line.book_id, line.available)
+          : await cartService.removeItem(line.book_id);
+      }
+      set({ cart, isLoading: false });
+    } catch (error: any) {
+      set({ error: error.error || 'Failed to update cart', isLoading: false });
+      throw error;
+    }
+  },
+
   getCartItemCount: () => {
     const cart = get().cart;
     if (!cart || !cart.items) return 0;
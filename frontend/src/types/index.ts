@@ -45,6 +45,7 @@ export interface Book {
   seller_id?: number;
   quantity: number;
   is_available: boolean;
+  cover_hash?: string;
   created_at: string;
   updated_at: string;
 }
@@ -60,26 +61,51 @@ export interface BookList {
   author_name: string;
   editorial_name: string;
   seller_username: string;
+  cover_hash?: string;
   created_at: string;
 }
 
+export interface FacetCount<T = string> {
+  value: T;
+  label?: string;
+  count: number;
+}
+
+export interface BookFacets {
+  count: number;
+  condition: FacetCount[];
+  language: FacetCount[];
+  author: FacetCount<number>[];
+  editorial: FacetCount<number>[];
+  price: { min: string | null; max: string | null; count: number }[];
+}
+
+export interface BookFilterParams {
+  search?: string;
+  author?: number;
+  condition?: string;
+  min_price?: number;
+  max_price?: number;
+}
+
+// Items of a guest cart aren't saved yet and have no id or timestamps
 export interface CartItem {
-  id: number;
+  id: number | null;
   book: Book;
   book_id?: number;
   quantity: number;
   subtotal: string;
-  created_at: string;
-  updated_at: string;
+  created_at: string | null;
+  updated_at: string | null;
 }
 
 export interface Cart {
-  id: number;
-  user: number;
+  id: number | null;
+  user: number | null;
   items: CartItem[];
   total: string;
-  created_at: string;
-  updated_at: string;
+  created_at: string | null;
+  updated_at: string | null;
 }
 
 export interface CheckoutResponse {
@@ -89,10 +115,23 @@ export interface CheckoutResponse {
     quantity: number;
     price: string;
     subtotal: string;
+    price_changed: boolean;
   }[];
   total: string;
 }
 
+// One cart item as checkout found it, reported for every item when checkout fails
+export interface CheckoutLine {
+  book_id: number;
+  title: string;
+  requested: number;
+  available: number;
+  price: string;
+  added_price: string | null;
+  price_changed: boolean;
+  ok: boolean;
+}
+
 export interface LoginCredentials {
   username: string;
   password: string;
@@ -112,3 +151,14 @@ export interface ApiError {
   [key: string]: any;
 }
 
+export interface CheckoutError extends ApiError {
+  lines?: CheckoutLine[];
+}
+
+
+// A page of a keyset-paginated list: follow `next` for the following page
+export interface CursorPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
@@ -1,22 +1,54 @@
+import { API_ORIGIN } from '../services/api';
+
+type CoverSize = 'S' | 'M' | 'L';
+
+// Widths of the thumbnails rendered by `manage.py ingest_covers`
+const COVER_WIDTHS: Record<CoverSize, number> = { S: 96, M: 240, L: 480 };
+
+interface CoverSource {
+  isbn: string;
+  cover_hash?: string;
+}
+
+function localCoverUrl(hash: string, size: CoverSize): string {
+  return `${API_ORIGIN}/covers/${hash.slice(0, 2)}/${hash}-${size}.webp`;
+}
+
 /**
- * Get book cover URL from Open Library API
- * @param isbn - Book ISBN (10 or 13 digits)
+ * Get book cover URL: the thumbnail served by the backend when the book has
+ * one, otherwise the Open Library cover for its ISBN
+ * @param book - Book with its ISBN and optional cover hash
  * @param size - Cover size: 'S' (small), 'M' (medium), 'L' (large)
  * @returns URL string for the book cover
  */
-export function getBookCoverUrl(isbn: string, size: 'S' | 'M' | 'L' = 'M'): string {
+export function getBookCoverUrl(book: CoverSource, size: CoverSize = 'M'): string {
+  if (book.cover_hash) {
+    return localCoverUrl(book.cover_hash, size);
+  }
+
   // Clean ISBN (remove hyphens and spaces)
-  const cleanIsbn = isbn.replace(/[-\s]/g, '');
+  const cleanIsbn = book.isbn.replace(/[-\s]/g, '');
   
   // Open Library cover API
   // Format: https://covers.openlibrary.org/b/isbn/{ISBN}-{size}.jpg
   return `https://covers.openlibrary.org/b/isbn/${cleanIsbn}-${size}.jpg`;
 }
 
+/**
+ * Get a srcset of every local thumbnail size, so the browser picks the
+ * smallest one that fits the layout. Undefined for books without a local cover.
+ */
+export function getBookCoverSrcSet(book: CoverSource): string | undefined {
+  const hash = book.cover_hash;
+  if (!hash) return undefined;
+  return (Object.keys(COVER_WIDTHS) as CoverSize[])
+    .map((size) => `${localCoverUrl(hash, size)} ${COVER_WIDTHS[size]}w`)
+    .join(', ');
+}
+
 /**
  * Get placeholder SVG for when book cover is not available
  */
 export function getPlaceholderCover(): string {
   return "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='400' height='600'%3E%3Crect fill='%23f3f4f6' width='400' height='600'/%3E%3Ctext x='50%25' y='50%25' font-size='80' text-anchor='middle' dominant-baseline='middle' fill='%239ca3af'%3E📚%3C/text%3E%3C/svg%3E";
 }
-
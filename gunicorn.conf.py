@@ -0,0 +1,129 @@
+"""
+Gunicorn configuration, read from the environment.
+
+    gunicorn -c gunicorn.conf.py bookstore.wsgi:application
+
+The app is imported once in the master (preload_app) and workers are forked
+from it, sharing the imported code and the warmed-up URLconf copy-on-write.
+"""
+
+import math
+import os
+import statistics
+import time
+from collections import deque
+
+# Render provides PORT and, when set on the service, WEB_CONCURRENCY
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+
+
+def available_cpus():
+    """
+    CPUs this process may actually use. os.cpu_count() reports the host's
+    CPUs inside a container; the affinity mask and the cgroup v2 CPU quota
+    reflect the container's share.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available outside Linux
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(math.ceil(int(quota) / int(period)), 1))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+# Requests are mostly spent waiting on the database, so each worker runs a
+# few threads; workers default to one per available CPU plus one, capped so
+# a large host can't start more workers than the instance has memory for
+workers = int(os.environ.get("WEB_CONCURRENCY", min(available_cpus() + 1, 8)))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Recycle workers now and then to bound slow memory growth; the jitter keeps
+# them from all restarting at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True") == "True"
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+# Requests between two stats lines of a worker (0 to only log on exit)
+stats_every = int(os.environ.get("GUNICORN_STATS_EVERY", 1000))
+
+# Per-worker request stats, filled after the fork
+_requests = 0
+_latencies = deque(maxlen=1000)
+
+
+def when_ready(server):
+    if preload_app:
+        # Import every view and fill the caches read on the first requests in
+        # the master, so workers inherit them; with the per-process cache used
+        # without REDIS_URL this is the only warm-up the workers get
+        from django.urls import get_resolver
+
+        from books.catalog import catalog_version
+        from books.trending import trending_books
+
+        get_resolver().url_patterns
+        try:
+            catalog_version()
+            trending_books()
+        except Exception:
+            server.log.exception("Cache warm-up failed; workers will fill the caches on demand")
+
+
+def pre_fork(server, worker):
+    # A connection opened in the master would be shared by every worker's
+    # copy of it; close it here, before forking, where it's safe to. Without
+    # preload_app the master never sets Django up and has none to close.
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    connections.close_all()
+
+
+def pre_request(worker, req):
+    req.started_at = time.monotonic()
+
+
+def post_request(worker, req, environ, resp):
+    global _requests
+    _requests += 1
+    _latencies.append(time.monotonic() - req.started_at)
+    if stats_every and _requests % stats_every == 0:
+        log_stats(worker)
+
+
+def worker_exit(server, worker):
+    log_stats(worker)
+
+
+def log_stats(worker):
+    """Requests served by the worker and the latency of its last 1000 requests"""
+    if not _latencies:
+        return
+    latencies = list(_latencies)
+    p95 = statistics.quantiles(latencies, n=20, method="inclusive")[-1] if len(latencies) > 1 else latencies[0]
+    worker.log.info(
+        "worker %s: %d requests, latency p50 %.1f ms, p95 %.1f ms, max %.1f ms",
+        worker.pid,
+        _requests,
+        statistics.median(latencies) * 1000,
+        p95 * 1000,
+        max(latencies) * 1000,
+    )